@@ -1,16 +1,38 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, BackgroundTasks
 from typing import Optional
 import pandas as pd
 import os
+import shutil
+import asyncio
+import codecs
+import orjson
 import hashlib
 import uuid
 from datetime import datetime
+from charset_normalizer import from_bytes
 from services.database import db_service
 from services.file_manager import FileManager
+from services.data_loader import DataLoader
 from config.settings import settings
 
 router = APIRouter()
 
+# Bytes inspected when guessing the encoding of an uploaded CSV
+ENCODING_SAMPLE_SIZE = 64 * 1024
+# Size of each read when streaming an upload to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Uploads up to this size are also kept in memory and parsed without re-reading the file
+IN_MEMORY_PARSE_LIMIT = 16 << 20
+
+def _detect_encoding(sample: bytes) -> str:
+    """Guess the text encoding of a CSV from a sample of its bytes"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    
+    match = from_bytes(sample[:ENCODING_SAMPLE_SIZE]).best()
+    # latin-1 maps every byte, so it is the safe fallback
+    return match.encoding if match else 'latin-1'
+
 @router.post("/upload")
 async def upload_document(
     file: UploadFile = File(...),
@@ -25,12 +47,6 @@ async def upload_document(
     if file_ext not in settings.allowed_extensions:
         raise HTTPException(400, f"File type {file_ext} not allowed")
     
-    # Validate file size
-    contents = await file.read()
-    file_size = len(contents)
-    if file_size > settings.max_upload_size:
-        raise HTTPException(400, f"File size exceeds limit of {settings.max_upload_size} bytes")
-    
     # Generate unique instance ID (this will be both document_id and folder name)
     # Use UUID for database, but create a simpler folder name
     import uuid
@@ -40,54 +56,62 @@ async def upload_document(
     # Create instance folder structure
     stage_paths = FileManager.create_instance_folders(instance_id)
     
-    # Save original file to stage 1 folder
+    # Stream original file to stage 1 folder, validating size as we go
     original_filename = file.filename
-    file_path = FileManager.save_stage_data(
-        instance_id=instance_id,
-        stage_num=1,
-        filename=f"original_{original_filename}",
-        data=contents
-    )
+    stage_1_path = stage_paths[1]
+    file_path = os.path.join(stage_1_path, f"original_{original_filename}")
+    file_size = 0
+    sample = b""
+    chunks = []
+    with open(file_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if file_size > settings.max_upload_size:
+                break
+            if len(sample) < ENCODING_SAMPLE_SIZE:
+                sample += chunk[:ENCODING_SAMPLE_SIZE - len(sample)]
+            if chunks is not None:
+                if file_size <= IN_MEMORY_PARSE_LIMIT:
+                    chunks.append(chunk)
+                else:
+                    # Too big to hold in memory; parse from disk instead
+                    chunks = None
+            f.write(chunk)
+    
+    if file_size > settings.max_upload_size:
+        shutil.rmtree(FileManager.get_instance_path(instance_id), ignore_errors=True)
+        raise HTTPException(400, f"File size exceeds limit of {settings.max_upload_size} bytes")
+    
+    # Parse small uploads from the bytes already in memory; larger ones from disk
+    source = b"".join(chunks) if chunks is not None else file_path
     
     # Read file and get basic info
+    encoding = None
     try:
         if file_ext == ".csv":
-            # Try different encodings, prioritize latin-1 for compatibility
-            encodings = ['latin-1', 'utf-8', 'iso-8859-1', 'cp1252', 'us-ascii']
-            df = None
-            read_error = None
-            successful_encoding = None
-            
-            for encoding in encodings:
-                try:
-                    # First try with just 5 rows to test encoding
-                    test_df = pd.read_csv(file_path, encoding=encoding, nrows=5)
-                    # If that works, read the full file
-                    df = pd.read_csv(file_path, encoding=encoding, low_memory=False)
-                    successful_encoding = encoding
-                    print(f"Successfully read CSV with {encoding} encoding")
-                    break
-                except (UnicodeDecodeError, Exception) as e:
-                    read_error = e
-                    print(f"Failed with {encoding}: {str(e)[:100]}")
-                    continue
-            
-            if df is None:
-                # If all encodings fail, raise the last error
-                raise HTTPException(400, f"Failed to read CSV file with any encoding. Last error: {str(read_error)}")
+            # Detect the encoding once from the leading bytes, then parse in a single pass
+            encoding = _detect_encoding(sample)
+            try:
+                table = DataLoader.read_csv_table(source, encoding=encoding)
+            except UnicodeDecodeError:
+                # The sample may not be representative of the whole file
+                encoding = 'latin-1'
+                table = DataLoader.read_csv_table(source, encoding=encoding)
+            print(f"Successfully read CSV with {encoding} encoding")
         else:  # Excel files
-            df = pd.read_excel(file_path)
+            table = DataLoader.to_arrow(pd.read_excel(DataLoader.open_source(source)))
         
-        row_count = len(df)
-        column_count = len(df.columns)
-        columns = df.columns.tolist()
+        row_count = table.num_rows
+        column_count = table.num_columns
+        columns = table.column_names
         
-        # Basic data profiling
+        # Basic data profiling, taken from Arrow schema and column metadata
         metadata = {
             "columns": columns,
-            "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
-            "missing_counts": df.isnull().sum().to_dict(),
-            "sample_rows": df.head(5).to_dict(orient='records')
+            "dtypes": {col: str(dtype) for col, dtype in zip(columns, table.schema.types)},
+            "missing_counts": {col: data.null_count for col, data in zip(columns, table.columns)},
+            # Round-trip through orjson so dates/decimals become JSON-safe for the DB metadata column
+            "sample_rows": orjson.loads(orjson.dumps(table.slice(0, 5).to_pylist(), default=str))
         }
         
         # Save profiling metadata to stage 1
@@ -96,15 +120,16 @@ async def upload_document(
                 "original_filename": original_filename,
                 "file_size": file_size,
                 "file_type": file_ext,
+                "encoding": encoding,
                 "rows": row_count,
                 "columns": column_count
             },
             "data_profile": metadata
         })
         
-        # Also save a copy of the data as CSV for easier processing
-        csv_path = os.path.join(FileManager.get_instance_path(instance_id, 1), "data.csv")
-        df.to_csv(csv_path, index=False)
+        # Also save a columnar copy of the data so later stages skip CSV parsing
+        data_path = os.path.join(stage_1_path, "data.parquet")
+        DataLoader.write_parquet(table, data_path)
         
     except Exception as e:
         # Don't remove file yet, for debugging
@@ -137,25 +162,28 @@ async def upload_document(
     # Create workflow for this document
     workflow_id = await db_service.create_workflow(document_id, "user")
     
-    # Log the upload
-    await db_service.create_audit_log({
-        "document_id": document_id,
-        "workflow_id": workflow_id,
-        "stage_number": 1,
-        "action_type": "document_upload",
-        "action_details": {
-            "filename": file.filename,
-            "size": file_size,
-            "rows": row_count,
-            "columns": column_count
-        }
-    })
-    
-    # Mark stage 1 as completed since upload is successful
-    try:
-        await db_service.update_stage_status(workflow_id, 1, 'completed')
-    except Exception as e:
-        print(f"Warning: Could not mark stage 1 as completed: {e}")
+    # The audit entry and stage 1 completion are independent, so issue them together
+    audit_result, stage_result = await asyncio.gather(
+        db_service.create_audit_log({
+            "document_id": document_id,
+            "workflow_id": workflow_id,
+            "stage_number": 1,
+            "action_type": "document_upload",
+            "action_details": {
+                "filename": file.filename,
+                "size": file_size,
+                "rows": row_count,
+                "columns": column_count
+            }
+        }),
+        # Mark stage 1 as completed since upload is successful
+        db_service.update_stage_status(workflow_id, 1, 'completed'),
+        return_exceptions=True
+    )
+    if isinstance(audit_result, Exception):
+        raise audit_result
+    if isinstance(stage_result, Exception):
+        print(f"Warning: Could not mark stage 1 as completed: {stage_result}")
         # Don't fail the upload if stage update fails
     
     return {
@@ -188,25 +216,29 @@ async def preview_document(document_id: str, rows: int = 10):
         raise HTTPException(404, "Document not found")
     
     try:
+        data_path = os.path.join(FileManager.get_instance_path(document_id, 1), "data.parquet")
         file_path = document['file_path']
         file_type = document['file_type']
         
-        if file_type == ".csv":
-            df = pd.read_csv(file_path, nrows=rows)
+        # Prefer the stage-1 Parquet copy: it is already decoded and typed
+        if os.path.exists(data_path):
+            table = DataLoader.read_parquet_head(data_path, rows)
+        elif file_type == ".csv":
+            table = DataLoader.read_csv_head(file_path, rows)
         else:
-            df = pd.read_excel(file_path, nrows=rows)
+            table = DataLoader.to_arrow(pd.read_excel(file_path, nrows=rows))
         
         return {
             "document_id": document_id,
-            "preview": df.to_dict(orient='records'),
-            "columns": df.columns.tolist(),
-            "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()}
+            "preview": table.to_pylist(),
+            "columns": table.column_names,
+            "dtypes": {col: str(dtype) for col, dtype in zip(table.column_names, table.schema.types)}
         }
     except Exception as e:
         raise HTTPException(500, f"Failed to preview document: {str(e)}")
 
 @router.post("/{document_id}/schema")
-async def update_schema(document_id: str, schema_mapping: dict):
+async def update_schema(document_id: str, schema_mapping: dict, background_tasks: BackgroundTasks):
     """Update column schema mapping"""
     document = await db_service.get_document(document_id)
     if not document:
@@ -215,7 +247,8 @@ async def update_schema(document_id: str, schema_mapping: dict):
     # Here we would update the schema mapping in the database
     # This is part of Stage 1 user review
     
-    await db_service.create_audit_log({
+    # The audit entry is not needed for the response, so write it after returning
+    background_tasks.add_task(db_service.create_audit_log, {
         "document_id": document_id,
         "action_type": "schema_update",
         "action_details": schema_mapping
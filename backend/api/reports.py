@@ -1,20 +1,29 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from fastapi.responses import FileResponse
 import pandas as pd
 import json
 import os
+import asyncio
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Dict, Optional
 from services.database import db_service
 from services.report_generator import ReportGenerator
 from services.file_manager import FileManager
+from services.data_loader import DataLoader
 from config.settings import settings
 
 router = APIRouter()
 
-report_generator = ReportGenerator()
+@lru_cache(maxsize=1)
+def get_report_generator() -> ReportGenerator:
+    """Shared ReportGenerator, created on first use (or at startup warmup)"""
+    return ReportGenerator()
 
 @router.post("/propose")
-async def propose_reports(workflow_id: str, document_id: str, config: Dict):
+async def propose_reports(workflow_id: str, document_id: str, config: Dict,
+                          background_tasks: BackgroundTasks,
+                          report_generator: ReportGenerator = Depends(get_report_generator)):
     """Stage 5: Propose report templates based on analysis"""
     
     # Get document and analysis results
@@ -39,8 +48,9 @@ async def propose_reports(workflow_id: str, document_id: str, config: Dict):
         "user_preferences": config
     })
     
-    # Update workflow status
-    await db_service.update_stage_status(
+    # Record progress after responding; 'in_progress' does not advance the workflow
+    background_tasks.add_task(
+        db_service.update_stage_status,
         workflow_id, 5, 'in_progress',
         data={'output_data': proposals}
     )
@@ -59,7 +69,7 @@ async def confirm_report_selection(workflow_id: str, document_id: str,
     # Save user confirmation
     FileManager.save_stage_metadata(document_id, 6, {
         "selected_reports": selected_reports,
-        "confirmed_at": pd.Timestamp.now().isoformat()
+        "confirmed_at": datetime.now(timezone.utc).isoformat()
     })
     
     # Update workflow status
@@ -74,57 +84,61 @@ async def confirm_report_selection(workflow_id: str, document_id: str,
     }
 
 @router.post("/generate")
-async def generate_final_reports(workflow_id: str, document_id: str):
+async def generate_final_reports(workflow_id: str, document_id: str,
+                                 report_generator: ReportGenerator = Depends(get_report_generator)):
     """Stage 7: Generate final reports"""
     
-    # Load data from all stages
-    instance_path = FileManager.get_instance_path(document_id)
+    # Resolve the stage folders used below once
+    stage_1_path = FileManager.get_instance_path(document_id, 1)
+    stage_7_path = FileManager.get_instance_path(document_id, 7)
     
     # Load original data
-    data_path = FileManager.get_instance_path(document_id, 1) + "/data.csv"
-    df = pd.read_csv(data_path)
+    data_path = os.path.join(stage_1_path, "data.parquet")
+    if os.path.exists(data_path):
+        df = DataLoader.read_parquet(data_path)
+    else:
+        # Re-parse the original upload with the types profiled at stage 1 instead of re-inferring them
+        table = FileManager.load_original_table(document_id)
+        if table is None:
+            raise HTTPException(404, "Stage 1 data not found")
+        df = table.to_pandas()
     
     # Get confirmed report configuration
     stage_6_metadata = FileManager.get_stage_files(document_id, 6).get("stage_metadata.json")
     
     # Generate reports
     generated_reports = []
-    
-    # 1. Generate HTML report
-    html_report = report_generator.generate_html_report(
-        df=df,
-        document_id=document_id,
-        workflow_id=workflow_id
+    html_path = os.path.join(stage_7_path, "final_report.html")
+    excel_path = os.path.join(stage_7_path, "final_report.xlsx")
+    
+    # Build the HTML, Excel and JSON reports in worker threads so they overlap
+    # with each other and do not block the event loop
+    _, _, summary = await asyncio.gather(
+        asyncio.to_thread(report_generator.generate_html_report_to, df, document_id, workflow_id, html_path),
+        asyncio.to_thread(report_generator.generate_excel_report, df, excel_path),
+        asyncio.to_thread(report_generator.generate_summary_json, df)
     )
     
-    html_path = FileManager.save_stage_data(
-        instance_id=document_id,
-        stage_num=7,
-        filename="final_report.html",
-        data=html_report.encode('utf-8')
-    )
+    # 1. HTML report (written directly by the generator)
     generated_reports.append({
         "type": "html",
         "path": html_path,
         "filename": "final_report.html"
     })
     
-    # 2. Generate Excel report
-    excel_path = FileManager.get_instance_path(document_id, 7) + "/final_report.xlsx"
-    report_generator.generate_excel_report(df, excel_path)
+    # 2. Excel report (written directly by the generator)
     generated_reports.append({
         "type": "excel",
         "path": excel_path,
         "filename": "final_report.xlsx"
     })
     
-    # 3. Generate summary JSON
-    summary = report_generator.generate_summary_json(df)
+    # 3. Summary JSON
     json_path = FileManager.save_stage_data(
         instance_id=document_id,
         stage_num=7,
         filename="summary.json",
-        data=summary.encode('utf-8')
+        data=summary
     )
     generated_reports.append({
         "type": "json",
@@ -135,20 +149,16 @@ async def generate_final_reports(workflow_id: str, document_id: str):
     # Save report metadata
     FileManager.save_stage_metadata(document_id, 7, {
         "generated_reports": generated_reports,
-        "generation_time": pd.Timestamp.now().isoformat()
+        "generation_time": datetime.now(timezone.utc).isoformat()
     })
     
-    # Update workflow status
-    await db_service.update_stage_status(
-        workflow_id, 7, 'completed',
-        data={'output_data': {'reports': generated_reports}}
-    )
-    
-    # Mark workflow as completed
-    await db_service.client.execute(
-        "ALTER TABLE workflows UPDATE status = 'completed', completed_at = now() "
-        "WHERE workflow_id = %(workflow_id)s",
-        {'workflow_id': workflow_id}
+    # Update stage 7 and mark the workflow as completed together
+    await asyncio.gather(
+        db_service.update_stage_status(
+            workflow_id, 7, 'completed',
+            data={'output_data': {'reports': generated_reports}}
+        ),
+        db_service.complete_workflow(workflow_id)
     )
     
     return {
@@ -184,7 +194,7 @@ async def download_report(document_id: str, report_type: str):
     )
 
 @router.get("/templates")
-async def get_available_templates():
+async def get_available_templates(report_generator: ReportGenerator = Depends(get_report_generator)):
     """Get list of available report templates"""
     
     templates = report_generator.get_available_templates()
@@ -1,22 +1,93 @@
 from fastapi import APIRouter, HTTPException
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from sklearn.impute import SimpleImputer, KNNImputer
 from typing import Dict, List, Optional
-import json
+import orjson
 import os
+import asyncio
+from functools import lru_cache
 from services.database import db_service
 from services.cleansing import CleansingService
 from services.analysis import AnalysisService
 from services.statistics import StatisticsService
 from services.file_manager import FileManager
+from services.data_loader import DataLoader
 
 router = APIRouter()
 
-# Initialize services
-cleansing_service = CleansingService()
-analysis_service = AnalysisService()
-statistics_service = StatisticsService()
+# Services are created on first use (or at startup warmup) rather than at import
+@lru_cache(maxsize=1)
+def get_cleansing_service() -> CleansingService:
+    return CleansingService()
+
+@lru_cache(maxsize=1)
+def get_analysis_service() -> AnalysisService:
+    return AnalysisService()
+
+@lru_cache(maxsize=1)
+def get_statistics_service() -> StatisticsService:
+    return StatisticsService()
+
+def _dump_json(obj) -> bytes:
+    """Serialize a stage result as indented JSON, numpy values included"""
+    return orjson.dumps(
+        obj,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    )
+
+# Working data saved by each stage, most processed first
+STAGE_DATA_FILES = [(2, "cleaned_data"), (1, "data")]
+
+def _load_data(document_id: str, stages=(2, 1)) -> pa.Table:
+    """Load the most processed copy of a document's data from the given stages"""
+    for stage_num, name in STAGE_DATA_FILES:
+        if stage_num in stages:
+            table = FileManager.load_stage_table(document_id, stage_num, name)
+            if table is not None:
+                return table
+    
+    # Fallback to re-parsing the original upload with its profiled types
+    table = FileManager.load_original_table(document_id)
+    if table is None:
+        raise HTTPException(404, "Stage 1 data not found")
+    return table
+
+def _load_frame(document_id: str, stages=(2, 1)) -> pd.DataFrame:
+    """Load the most processed copy of a document's data as a DataFrame"""
+    return _load_data(document_id, stages).to_pandas()
+
+def _find_outliers(table: pa.Table) -> Dict:
+    """IQR outlier summary for the numeric columns of a table"""
+    # Only numeric columns are converted to pandas; bounds and masks for all columns at once
+    numeric_df = table.select(DataLoader.numeric_columns(table)).to_pandas()
+    quartiles = numeric_df.quantile([0.25, 0.75])
+    Q1 = quartiles.loc[0.25]
+    Q3 = quartiles.loc[0.75]
+    IQR = Q3 - Q1
+    lower_bounds = Q1 - 1.5 * IQR
+    upper_bounds = Q3 + 1.5 * IQR
+    
+    # Both comparisons land in one mask array, with no temporary for the OR
+    values = numeric_df.to_numpy(dtype=np.float64)
+    outlier_mask = values < lower_bounds.to_numpy()
+    outlier_mask |= values > upper_bounds.to_numpy()
+    outlier_counts = outlier_mask.sum(axis=0)
+    
+    outliers = {}
+    for j, col in enumerate(numeric_df.columns):
+        count = int(outlier_counts[j])
+        if count > 0:
+            outliers[col] = {
+                "count": count,
+                "percentage": round((count / table.num_rows) * 100, 2),
+                "lower_bound": round(lower_bounds[col], 2),
+                "upper_bound": round(upper_bounds[col], 2),
+                "outlier_values": numeric_df[col].to_numpy()[np.flatnonzero(outlier_mask[:, j])[:10]].tolist()
+            }
+    return outliers
 
 @router.post("/cleansing/analyze")
 async def analyze_data_quality(workflow_id: str, document_id: str):
@@ -27,13 +98,23 @@ async def analyze_data_quality(workflow_id: str, document_id: str):
     if not document:
         raise HTTPException(404, "Document not found")
     
+    # The report depends only on the stage 1 data, so reuse the last one while that file is unchanged
+    data_path = os.path.join(FileManager.get_instance_path(document_id, 1), "data.parquet")
+    source_mtime = os.stat(data_path).st_mtime_ns if os.path.exists(data_path) else None
+    previous_report = FileManager.load_stage_metadata(document_id, 2)
+    if source_mtime is not None and previous_report.pop("source_mtime_ns", None) == source_mtime:
+        return previous_report
+    
     # Load data from stage 1 folder
-    data_path = FileManager.get_instance_path(document_id, 1) + "/data.csv"
-    if os.path.exists(data_path):
-        df = pd.read_csv(data_path, low_memory=False)
-    else:
-        # Fallback to original file path
-        df = pd.read_csv(document['file_path'], low_memory=False) if document['file_type'] == '.csv' else pd.read_excel(document['file_path'])
+    table = await asyncio.to_thread(_load_data, document_id, stages=(1,))
+    
+    # Outlier detection runs in a worker thread while the metadata-only checks below proceed
+    outlier_task = asyncio.create_task(asyncio.to_thread(_find_outliers, table))
+    
+    # Null counts and dtypes come from Arrow metadata
+    row_count = table.num_rows
+    dtypes = DataLoader.pandas_dtypes(table)
+    numeric_set = set(DataLoader.numeric_columns(table))
     
     # Analyze data quality
     quality_report = {
@@ -43,60 +124,50 @@ async def analyze_data_quality(workflow_id: str, document_id: str):
         "suggested_actions": []
     }
     
-    # Missing data analysis
-    for col in df.columns:
-        missing_count = df[col].isnull().sum()
-        missing_pct = (missing_count / len(df)) * 100
-        
-        quality_report["missing_data"][col] = {
-            "count": int(missing_count),
-            "percentage": round(missing_pct, 2),
-            "pattern": "MCAR" if missing_pct < 5 else "MAR" if missing_pct < 20 else "MNAR"
+    # Missing data analysis, classified for all columns at once
+    columns = table.column_names
+    missing_counts = np.array([column.null_count for column in table.columns])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        missing_pcts = missing_counts / row_count * 100
+    is_numeric = np.array([col in numeric_set for col in columns], dtype=bool)
+    patterns = np.select([missing_pcts < 5, missing_pcts < 20], ["MCAR", "MAR"], default="MNAR")
+    suggestions = np.select(
+        [is_numeric & (missing_pcts < 10), is_numeric], ["mean", "median"], default="mode"
+    )
+    
+    quality_report["missing_data"] = {
+        col: {
+            "count": int(count),
+            "percentage": round(float(pct), 2),
+            "pattern": pattern
         }
-        
-        if missing_pct > 0:
-            if df[col].dtype in ['float64', 'int64']:
-                quality_report["suggested_actions"].append({
-                    "column": col,
-                    "issue": "missing_values",
-                    "suggestion": "mean" if missing_pct < 10 else "median"
-                })
-            else:
-                quality_report["suggested_actions"].append({
-                    "column": col,
-                    "issue": "missing_values",
-                    "suggestion": "mode"
-                })
+        for col, count, pct, pattern in zip(columns, missing_counts, missing_pcts, patterns.tolist())
+    }
+    quality_report["suggested_actions"] = [
+        {
+            "column": col,
+            "issue": "missing_values",
+            "suggestion": suggestion
+        }
+        for col, pct, suggestion in zip(columns, missing_pcts, suggestions.tolist())
+        if pct > 0
+    ]
     
     # Outlier detection for numeric columns
-    for col in df.select_dtypes(include=[np.number]).columns:
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)][col]
-        
-        if len(outliers) > 0:
-            quality_report["outliers"][col] = {
-                "count": len(outliers),
-                "percentage": round((len(outliers) / len(df)) * 100, 2),
-                "lower_bound": round(lower_bound, 2),
-                "upper_bound": round(upper_bound, 2),
-                "outlier_values": outliers.head(10).tolist()
-            }
+    quality_report["outliers"] = await outlier_task
     
     # Data types
-    quality_report["data_types"] = {col: str(dtype) for col, dtype in df.dtypes.items()}
+    quality_report["data_types"] = dtypes
     
-    # Save quality report to stage 2 folder
+    # Save quality report to stage 2 folder, recording which version of the data it describes
+    quality_report["source_mtime_ns"] = source_mtime
     FileManager.save_stage_metadata(document_id, 2, quality_report)
+    quality_report.pop("source_mtime_ns")
     FileManager.save_stage_data(
         instance_id=document_id,
         stage_num=2,
         filename="quality_report.json",
-        data=json.dumps(quality_report, indent=2).encode()
+        data=_dump_json(quality_report)
     )
     
     return quality_report
@@ -110,19 +181,30 @@ async def impute_missing_values(workflow_id: str, document_id: str, imputation_c
         raise HTTPException(404, "Document not found")
     
     # Load data from stage 1 folder
-    data_path = FileManager.get_instance_path(document_id, 1) + "/data.csv"
-    if os.path.exists(data_path):
-        df = pd.read_csv(data_path, low_memory=False)
-    else:
-        # Fallback to original file path
-        df = pd.read_csv(document['file_path'], low_memory=False) if document['file_type'] == '.csv' else pd.read_excel(document['file_path'])
+    df = await asyncio.to_thread(_load_frame, document_id, stages=(1,))
     
     results = {
         "imputed_columns": [],
         "errors": []
     }
     
-    # Apply imputation based on config
+    numeric_set = set(df.select_dtypes(include=[np.number]).columns)
+    
+    # Impute all KNN columns in one fit so neighbours are found across all of them
+    knn_cols = [
+        col for col, strategy in imputation_config.items()
+        if strategy == "knn" and col in numeric_set and df[col].notna().any()
+    ]
+    knn_error = None
+    if knn_cols:
+        try:
+            df[knn_cols] = await asyncio.to_thread(KNNImputer(n_neighbors=5).fit_transform, df[knn_cols])
+        except Exception as e:
+            knn_error = e
+    
+    # Apply imputation based on config; value fills are collected and applied together below
+    fill_values = {}
+    imputed = []
     for col, strategy in imputation_config.items():
         if col not in df.columns:
             results["errors"].append(f"Column {col} not found")
@@ -130,47 +212,49 @@ async def impute_missing_values(workflow_id: str, document_id: str, imputation_c
         
         try:
             if strategy == "mean":
-                df[col].fillna(df[col].mean(), inplace=True)
+                fill_values[col] = df[col].mean()
             elif strategy == "median":
-                df[col].fillna(df[col].median(), inplace=True)
+                fill_values[col] = df[col].median()
             elif strategy == "mode":
-                df[col].fillna(df[col].mode()[0] if not df[col].mode().empty else np.nan, inplace=True)
+                counts = df[col].value_counts()
+                fill_values[col] = counts.index[0] if not counts.empty else np.nan
             elif strategy == "forward_fill":
                 df[col] = df[col].ffill()
             elif strategy == "backward_fill":
                 df[col] = df[col].bfill()
             elif strategy == "knn":
-                # Use KNN imputation for numeric columns
-                if df[col].dtype in ['float64', 'int64']:
-                    imputer = KNNImputer(n_neighbors=5)
-                    df[col] = imputer.fit_transform(df[[col]])
+                # Numeric columns were imputed together above
+                if col in knn_cols and knn_error is not None:
+                    raise knn_error
             elif isinstance(strategy, (int, float, str)):
                 # Custom value
-                df[col].fillna(strategy, inplace=True)
+                fill_values[col] = strategy
             
-            results["imputed_columns"].append({
-                "column": col,
-                "strategy": strategy,
-                "remaining_missing": int(df[col].isnull().sum())
-            })
+            imputed.append((col, strategy))
         except Exception as e:
             results["errors"].append(f"Failed to impute {col}: {str(e)}")
     
+    # One fillna pass for all mean/median/mode/custom value columns
+    if fill_values:
+        df = df.fillna(fill_values)
+    
+    remaining_missing = df[[col for col, _ in imputed]].isnull().sum()
+    for col, strategy in imputed:
+        results["imputed_columns"].append({
+            "column": col,
+            "strategy": strategy,
+            "remaining_missing": int(remaining_missing[col])
+        })
+    
     # Save cleaned data to stage 2 folder
-    cleaned_csv = df.to_csv(index=False)
-    cleaned_path = FileManager.save_stage_data(
-        instance_id=document_id,
-        stage_num=2,
-        filename="cleaned_data.csv",
-        data=cleaned_csv.encode()
-    )
+    cleaned_path = FileManager.save_stage_frame(document_id, 2, "cleaned_data", df)
     
     # Save imputation results
     FileManager.save_stage_data(
         instance_id=document_id,
         stage_num=2,
         filename="imputation_results.json",
-        data=json.dumps(results, indent=2).encode()
+        data=_dump_json(results)
     )
     
     # Update stage status
@@ -187,70 +271,78 @@ async def handle_outliers(workflow_id: str, document_id: str, outlier_config: Di
     
     document = await db_service.get_document(document_id)
     # Load data from stage 1 or 2 folder
-    cleansed_path = FileManager.get_instance_path(document_id, 2) + "/cleaned_data.csv"
-    data_path = FileManager.get_instance_path(document_id, 1) + "/data.csv"
-    
-    if os.path.exists(cleansed_path):
-        df = pd.read_csv(cleansed_path, low_memory=False)
-    elif os.path.exists(data_path):
-        df = pd.read_csv(data_path, low_memory=False)
-    else:
-        df = pd.read_csv(document['file_path'], low_memory=False) if document['file_type'] == '.csv' else pd.read_excel(document['file_path'])
+    df = await asyncio.to_thread(_load_frame, document_id)
     
     results = {
         "processed_columns": [],
         "errors": []
     }
     
+    numeric_set = set(df.select_dtypes(include=[np.number]).columns)
+    
+    # Quartiles of every IQR-handled column, computed together and reused until rows are dropped
+    iqr_cols = [
+        col for col, method in outlier_config.items()
+        if method in ("remove", "cap") and col in numeric_set
+    ]
+    quartiles = None
+    
+    # Rows still kept; removals only update this mask and the frame is filtered once at the end
+    keep = np.ones(len(df), dtype=bool)
+    
     for col, method in outlier_config.items():
         if col not in df.columns:
             results["errors"].append(f"Column {col} not found")
             continue
         
-        if df[col].dtype not in ['float64', 'int64']:
+        if col not in numeric_set:
             results["errors"].append(f"Column {col} is not numeric")
             continue
         
         try:
-            if method == "remove":
-                Q1 = df[col].quantile(0.25)
-                Q3 = df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                df = df[~((df[col] < Q1 - 1.5 * IQR) | (df[col] > Q3 + 1.5 * IQR))]
-            elif method == "cap":
-                Q1 = df[col].quantile(0.25)
-                Q3 = df[col].quantile(0.75)
+            if method in ("remove", "cap"):
+                if quartiles is None:
+                    quartiles = df.loc[keep, iqr_cols].quantile([0.25, 0.75])
+                Q1 = quartiles.at[0.25, col]
+                Q3 = quartiles.at[0.75, col]
                 IQR = Q3 - Q1
                 lower = Q1 - 1.5 * IQR
                 upper = Q3 + 1.5 * IQR
-                df[col] = df[col].clip(lower=lower, upper=upper)
+                values = df[col].to_numpy()
+                if method == "remove":
+                    outside = values < lower
+                    outside |= values > upper
+                    keep &= ~outside
+                    quartiles = None
+                else:
+                    # Capping only changes this column, so the other quartiles stay valid
+                    df[col] = np.clip(values, lower, upper)
             elif method == "zscore":
-                from scipy import stats
-                df = df[(np.abs(stats.zscore(df[col])) < 3)]
+                # Population std (ddof=0) as in scipy.stats.zscore; missing values are skipped
+                kept_values = df.loc[keep, col]
+                z_scores = (df[col] - kept_values.mean()) / kept_values.std(ddof=0)
+                keep &= (z_scores.abs() < 3).to_numpy()
+                quartiles = None
             
             results["processed_columns"].append({
                 "column": col,
                 "method": method,
-                "rows_after": len(df)
+                "rows_after": int(keep.sum())
             })
         except Exception as e:
             results["errors"].append(f"Failed to process outliers in {col}: {str(e)}")
     
+    df = df[keep]
+    
     # Save processed data to stage 2 folder
-    processed_csv = df.to_csv(index=False)
-    processed_path = FileManager.save_stage_data(
-        instance_id=document_id,
-        stage_num=2,
-        filename="outliers_processed.csv",
-        data=processed_csv.encode()
-    )
+    processed_path = FileManager.save_stage_frame(document_id, 2, "outliers_processed", df)
     
     # Save outlier processing results
     FileManager.save_stage_data(
         instance_id=document_id,
         stage_num=2,
         filename="outlier_results.json",
-        data=json.dumps(results, indent=2).encode()
+        data=_dump_json(results)
     )
     
     return results
@@ -260,16 +352,11 @@ async def discover_patterns(workflow_id: str, document_id: str):
     """Stage 3: Analyze and discover patterns in data"""
     
     document = await db_service.get_document(document_id)
-    # Load data from stage 1 or 2 folder
-    cleansed_path = FileManager.get_instance_path(document_id, 2) + "/cleaned_data.csv"
-    data_path = FileManager.get_instance_path(document_id, 1) + "/data.csv"
-    
-    if os.path.exists(cleansed_path):
-        df = pd.read_csv(cleansed_path, low_memory=False)
-    elif os.path.exists(data_path):
-        df = pd.read_csv(data_path, low_memory=False)
-    else:
-        df = pd.read_csv(document['file_path'], low_memory=False) if document['file_type'] == '.csv' else pd.read_excel(document['file_path'])
+    # Load data from stage 1 or 2 folder; only numeric columns are needed as pandas data
+    table = await asyncio.to_thread(_load_data, document_id)
+    numeric_cols = DataLoader.numeric_columns(table)
+    numeric_set = set(numeric_cols)
+    df = await asyncio.to_thread(table.select(numeric_cols).to_pandas)
     
     analysis_results = {
         "variable_types": {},
@@ -278,10 +365,10 @@ async def discover_patterns(workflow_id: str, document_id: str):
         "distributions": {}
     }
     
-    # Classify variables
-    for col in df.columns:
-        if df[col].dtype in ['float64', 'int64']:
-            unique_ratio = df[col].nunique() / len(df)
+    # Classify variables; distinct counts come straight from the Arrow columns
+    for col, column in zip(table.column_names, table.columns):
+        if col in numeric_set:
+            unique_ratio = pc.count_distinct(column).as_py() / table.num_rows
             if unique_ratio < 0.05:
                 analysis_results["variable_types"][col] = "categorical"
             else:
@@ -289,33 +376,42 @@ async def discover_patterns(workflow_id: str, document_id: str):
         else:
             analysis_results["variable_types"][col] = "categorical"
     
-    # Key statistics for numeric columns
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    for col in numeric_cols:
-        analysis_results["key_statistics"][col] = {
-            "mean": round(df[col].mean(), 2),
-            "median": round(df[col].median(), 2),
-            "std": round(df[col].std(), 2),
-            "min": round(df[col].min(), 2),
-            "max": round(df[col].max(), 2),
-            "q1": round(df[col].quantile(0.25), 2),
-            "q3": round(df[col].quantile(0.75), 2)
-        }
+    # Key statistics for numeric columns, from a single describe() pass
+    if numeric_cols:
+        described = df[numeric_cols].describe().round(2).to_dict()
+        for col in numeric_cols:
+            col_stats = described[col]
+            analysis_results["key_statistics"][col] = {
+                "mean": col_stats["mean"],
+                "median": col_stats["50%"],
+                "std": col_stats["std"],
+                "min": col_stats["min"],
+                "max": col_stats["max"],
+                "q1": col_stats["25%"],
+                "q3": col_stats["75%"]
+            }
     
     # Correlation matrix for numeric columns
     if len(numeric_cols) > 1:
-        corr_matrix = df[numeric_cols].corr()
-        # Find high correlations
-        high_corr = []
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i+1, len(corr_matrix.columns)):
-                if abs(corr_matrix.iloc[i, j]) > 0.7:
-                    high_corr.append({
-                        "var1": corr_matrix.columns[i],
-                        "var2": corr_matrix.columns[j],
-                        "correlation": round(corr_matrix.iloc[i, j], 3)
-                    })
-        analysis_results["correlations"]["high_correlations"] = high_corr
+        values = df[numeric_cols].to_numpy(dtype=np.float64)
+        if np.isnan(values).any():
+            # Pairwise-complete correlations when values are missing
+            corr_matrix = df[numeric_cols].corr().to_numpy()
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr_matrix = np.corrcoef(values, rowvar=False)
+        # Find high correlations in the upper triangle
+        rows, cols = np.triu_indices(len(numeric_cols), k=1)
+        pair_corr = corr_matrix[rows, cols]
+        high = np.abs(pair_corr) > 0.7
+        analysis_results["correlations"]["high_correlations"] = [
+            {
+                "var1": numeric_cols[i],
+                "var2": numeric_cols[j],
+                "correlation": round(float(r), 3)
+            }
+            for i, j, r in zip(rows[high], cols[high], pair_corr[high])
+        ]
     
     # Save analysis results to stage 3 folder
     FileManager.save_stage_metadata(document_id, 3, analysis_results)
@@ -323,7 +419,7 @@ async def discover_patterns(workflow_id: str, document_id: str):
         instance_id=document_id,
         stage_num=3,
         filename="analysis_results.json",
-        data=json.dumps(analysis_results, indent=2).encode()
+        data=_dump_json(analysis_results)
     )
     
     # Save key statistics as CSV for easier viewing
@@ -344,18 +440,14 @@ async def calculate_statistics(workflow_id: str, document_id: str, config: Dict)
     
     document = await db_service.get_document(document_id)
     # Load data from stage 1 or 2 folder
-    cleansed_path = FileManager.get_instance_path(document_id, 2) + "/cleaned_data.csv"
-    data_path = FileManager.get_instance_path(document_id, 1) + "/data.csv"
-    
-    if os.path.exists(cleansed_path):
-        df = pd.read_csv(cleansed_path, low_memory=False)
-    elif os.path.exists(data_path):
-        df = pd.read_csv(data_path, low_memory=False)
-    else:
-        df = pd.read_csv(document['file_path'], low_memory=False) if document['file_type'] == '.csv' else pd.read_excel(document['file_path'])
+    table = await asyncio.to_thread(_load_data, document_id)
     
     weight_col = config.get("weight_column", "survey_weight")
-    variables = config.get("variables", df.select_dtypes(include=[np.number]).columns.tolist())
+    variables = config.get("variables", DataLoader.numeric_columns(table))
+    
+    # Only the requested variables and the weight column are converted to pandas
+    needed = set(variables) | {weight_col}
+    df = await asyncio.to_thread(table.select([col for col in table.column_names if col in needed]).to_pandas)
     
     results = {
         "weighted_means": {},
@@ -371,21 +463,37 @@ async def calculate_statistics(workflow_id: str, document_id: str, config: Dict)
         # Use equal weights if no weight column
         weights = np.ones(len(df))
     
-    for var in variables:
-        if var not in df.columns or df[var].dtype not in ['float64', 'int64']:
-            continue
+    numeric_set = set(df.select_dtypes(include=[np.number]).columns)
+    numeric_vars = [var for var in variables if var in numeric_set]
+    
+    # No numeric variables requested: the results stay empty
+    standard_errors = {}
+    weighted_totals = weighted_means = np.empty(0)
+    if numeric_vars:
+        # Standard deviation and non-null count for all variables in one pass
+        moments = df[numeric_vars].agg(['std', 'count'])
+        standard_errors = moments.loc['std'] / np.sqrt(moments.loc['count'])
+        
+        # Weighted totals and means for all variables at once; each value keeps its own row's weight
+        values = df[numeric_vars].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        row_weights = present * np.asarray(weights, dtype=np.float64)[:, None]
+        weighted_totals = (np.where(present, values, 0.0) * row_weights).sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weighted_means = weighted_totals / row_weights.sum(axis=0)
+    
+    for i, var in enumerate(numeric_vars):
         
         # Weighted mean
-        weighted_mean = np.average(df[var].dropna(), weights=weights[:len(df[var].dropna())])
+        weighted_mean = weighted_means[i]
         results["weighted_means"][var] = round(weighted_mean, 3)
         
         # Weighted total (population estimate)
-        weighted_total = np.sum(df[var].dropna() * weights[:len(df[var].dropna())])
+        weighted_total = weighted_totals[i]
         results["weighted_totals"][var] = round(weighted_total, 0)
         
         # Standard error (simplified)
-        n = len(df[var].dropna())
-        se = df[var].std() / np.sqrt(n)
+        se = standard_errors[var]
         results["standard_errors"][var] = round(se, 3)
         
         # 95% Confidence interval
@@ -402,7 +510,7 @@ async def calculate_statistics(workflow_id: str, document_id: str, config: Dict)
         instance_id=document_id,
         stage_num=4,
         filename="weighted_statistics.json",
-        data=json.dumps(results, indent=2).encode()
+        data=_dump_json(results)
     )
     
     # Save statistics as CSV for easier viewing
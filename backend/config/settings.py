@@ -13,6 +13,7 @@ class Settings(BaseSettings):
     clickhouse_user: str = "default"
     clickhouse_password: str = "clickhouse"
     clickhouse_database: str = "aideps"
+    clickhouse_pool_size: int = 4  # connections, i.e. queries in flight at once
     
     # File Storage
     data_dir: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
@@ -34,6 +35,8 @@ class Settings(BaseSettings):
     # Processing
     batch_size: int = 1000
     max_workers: int = 4
+    dataframe_cache_size: int = 4  # decoded stage files kept in memory
+    dataframe_cache_ttl: int = 600  # seconds
     
     # Workflow
     total_stages: int = 7
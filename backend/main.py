@@ -13,6 +13,11 @@ async def lifespan(app: FastAPI):
     # Initialize the singleton db_service from database module
     from services.database import db_service
     await db_service.initialize()
+    # Warm up shared services so the first request does not construct them
+    stages.get_cleansing_service()
+    stages.get_analysis_service()
+    stages.get_statistics_service()
+    reports.get_report_generator()
     yield
     # Shutdown
     print("Shutting down AIDEPS Backend...")
@@ -1,120 +1,226 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
 from typing import Dict, List, Optional
 
 class AnalysisService:
     """Service for data analysis and discovery (Stage 3)"""
     
-    def identify_variable_types(self, df: pd.DataFrame) -> Dict:
+    def _profile(self, df: pd.DataFrame) -> Dict:
+        """Column facts shared by the summary report steps, computed once per frame"""
+        null_mask = df.isnull()
+        return {
+            "numeric_cols": df.select_dtypes(include=[np.number]).columns,
+            "object_cols": df.select_dtypes(include=['object', 'category']).columns,
+            "null_mask": null_mask,
+            "null_counts": null_mask.sum(),
+            # Filled lazily by _value_counts
+            "value_counts": {}
+        }
+    
+    def _count_values(self, series: pd.Series) -> pd.Series:
+        """Non-missing value counts, most frequent first"""
+        value_counts = series.value_counts(dropna=True)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Counted from the integer codes, but unused categories come back with zero counts
+            value_counts = value_counts[value_counts > 0]
+        return value_counts
+    
+    def _value_counts(self, df: pd.DataFrame, column: str, profile: Optional[Dict] = None) -> pd.Series:
+        """Non-missing value counts for a column, reused across steps when a profile is given"""
+        if profile is None:
+            return self._count_values(df[column])
+        cache = profile["value_counts"]
+        if column not in cache:
+            cache[column] = self._count_values(df[column])
+        return cache[column]
+    
+    def identify_variable_types(self, df: pd.DataFrame, profile: Optional[Dict] = None) -> Dict:
         """Identify and classify variable types"""
         variable_types = {}
+        columns = df.columns
         
-        for column in df.columns:
-            dtype = df[column].dtype
-            unique_count = df[column].nunique()
-            total_count = len(df[column].dropna())
-            unique_ratio = unique_count / total_count if total_count > 0 else 0
-            
-            # Determine variable type
-            if dtype in ['object', 'string']:
-                if unique_count == 2:
-                    variable_types[column] = {
-                        "type": "binary",
-                        "values": df[column].unique().tolist()
-                    }
-                elif unique_count < 10:
-                    variable_types[column] = {
-                        "type": "categorical",
-                        "unique_values": unique_count,
-                        "values": df[column].value_counts().to_dict()
-                    }
-                else:
-                    variable_types[column] = {
-                        "type": "text",
-                        "unique_values": unique_count
-                    }
-            
-            elif dtype in ['int64', 'float64']:
-                if unique_count == 2:
-                    variable_types[column] = {
-                        "type": "binary_numeric",
-                        "values": df[column].unique().tolist()
-                    }
-                elif unique_count < 10 and unique_ratio < 0.05:
-                    variable_types[column] = {
-                        "type": "ordinal",
-                        "unique_values": unique_count,
-                        "values": sorted(df[column].unique().tolist())
-                    }
-                else:
-                    variable_types[column] = {
-                        "type": "continuous",
-                        "range": [float(df[column].min()), float(df[column].max())]
-                    }
-            
-            elif dtype in ['datetime64', 'datetime64[ns]']:
+        # Dtype classes for all columns up front (by kind, so int32/float32 count as numeric)
+        kinds = np.array([dtype.kind for dtype in df.dtypes])
+        is_object = np.isin(kinds, ['O', 'U'])
+        is_numeric = np.isin(kinds, ['i', 'u', 'f'])
+        is_datetime = kinds == 'M'
+        
+        null_counts = profile["null_counts"] if profile else df.isnull().sum()
+        total_counts = len(df) - null_counts.to_numpy()
+        # Object columns need their value counts anyway (shared with detect_patterns);
+        # numeric ones only need the number of distinct values, which skips the sort
+        unique_counts = np.array([
+            len(self._value_counts(df, column, profile)) if is_object[i]
+            else df[column].nunique() if is_numeric[i]
+            else 0
+            for i, column in enumerate(columns)
+        ], dtype=np.int64)
+        unique_ratios = np.divide(
+            unique_counts, total_counts,
+            out=np.zeros(len(columns)), where=total_counts > 0
+        )
+        
+        # Determine variable types
+        variable_classes = np.select(
+            [
+                is_object & (unique_counts == 2),
+                is_object & (unique_counts < 10),
+                is_object,
+                is_numeric & (unique_counts == 2),
+                is_numeric & (unique_counts < 10) & (unique_ratios < 0.05),
+                is_numeric,
+                is_datetime
+            ],
+            ["binary", "categorical", "text", "binary_numeric", "ordinal", "continuous", "datetime"],
+            default="unknown"
+        )
+        
+        # Ranges for continuous and datetime columns in one reduction each
+        range_cols = columns[(variable_classes == "continuous") | is_datetime]
+        minimums = df[range_cols].min()
+        maximums = df[range_cols].max()
+        
+        for column, variable_class, unique_count in zip(columns, variable_classes, unique_counts):
+            if variable_class in ("binary", "binary_numeric"):
+                variable_types[column] = {
+                    "type": variable_class,
+                    "values": self._value_counts(df, column, profile).index.to_list()
+                }
+            elif variable_class == "categorical":
+                variable_types[column] = {
+                    "type": "categorical",
+                    "unique_values": int(unique_count),
+                    "values": self._value_counts(df, column, profile).to_dict()
+                }
+            elif variable_class == "text":
+                variable_types[column] = {
+                    "type": "text",
+                    "unique_values": int(unique_count)
+                }
+            elif variable_class == "ordinal":
+                variable_types[column] = {
+                    "type": "ordinal",
+                    "unique_values": int(unique_count),
+                    "values": sorted(self._value_counts(df, column, profile).index.to_list())
+                }
+            elif variable_class == "continuous":
+                variable_types[column] = {
+                    "type": "continuous",
+                    "range": [float(minimums[column]), float(maximums[column])]
+                }
+            elif variable_class == "datetime":
                 variable_types[column] = {
                     "type": "datetime",
-                    "min": str(df[column].min()),
-                    "max": str(df[column].max())
+                    "min": str(minimums[column]),
+                    "max": str(maximums[column])
                 }
-            
             else:
                 variable_types[column] = {
                     "type": "unknown",
-                    "dtype": str(dtype)
+                    "dtype": str(df[column].dtype)
                 }
         
         return variable_types
     
-    def calculate_descriptive_stats(self, df: pd.DataFrame) -> Dict:
+    def calculate_descriptive_stats(self, df: pd.DataFrame, profile: Optional[Dict] = None) -> Dict:
         """Calculate descriptive statistics for all numeric columns"""
         stats_dict = {}
         
-        numeric_columns = df.select_dtypes(include=[np.number]).columns
+        numeric_columns = profile["numeric_cols"] if profile else df.select_dtypes(include=[np.number]).columns
+        
+        if len(numeric_columns) == 0:
+            return stats_dict
+        
+        # All columns at once: one float block, moments and quantiles reduced along axis 0
+        values = df[numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        counts = present.sum(axis=0)
+        has_data = counts > 0
+        numeric_columns, values, present, counts = (
+            numeric_columns[has_data], values[:, has_data], present[:, has_data], counts[has_data]
+        )
+        if len(numeric_columns) == 0:
+            return stats_dict
         
-        for column in numeric_columns:
-            col_data = df[column].dropna()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.nanmean(values, axis=0)
+            deviations = np.where(present, values - means, 0.0)
+            squared = deviations ** 2
+            m2 = squared.sum(axis=0)
+            m3 = (squared * deviations).sum(axis=0)
+            m4 = (squared ** 2).sum(axis=0)
+            stds = np.sqrt(m2 / (counts - 1))
+            stds[counts < 2] = np.nan
             
-            if len(col_data) > 0:
-                stats_dict[column] = {
-                    "count": int(len(col_data)),
-                    "mean": float(col_data.mean()),
-                    "std": float(col_data.std()),
-                    "min": float(col_data.min()),
-                    "25%": float(col_data.quantile(0.25)),
-                    "50%": float(col_data.quantile(0.50)),
-                    "75%": float(col_data.quantile(0.75)),
-                    "max": float(col_data.max()),
-                    "skewness": float(col_data.skew()),
-                    "kurtosis": float(col_data.kurtosis())
-                }
+            # Bias-corrected skewness and excess kurtosis, as pandas computes them
+            m2[np.abs(m2) < 1e-14] = 0
+            m3[np.abs(m3) < 1e-14] = 0
+            skewness = np.where(
+                m2 == 0, 0.0,
+                (counts * (counts - 1) ** 0.5 / (counts - 2)) * (m3 / m2 ** 1.5)
+            )
+            skewness[counts < 3] = np.nan
+            numerator = counts * (counts + 1) * (counts - 1) * m4
+            denominator = (counts - 2) * (counts - 3) * m2 ** 2
+            numerator[np.abs(numerator) < 1e-14] = 0
+            denominator[np.abs(denominator) < 1e-14] = 0
+            kurtosis = np.where(
+                denominator == 0, 0.0,
+                numerator / denominator - 3 * (counts - 1) ** 2 / ((counts - 2) * (counts - 3))
+            )
+            kurtosis[counts < 4] = np.nan
+        
+        minimums = np.nanmin(values, axis=0)
+        maximums = np.nanmax(values, axis=0)
+        q1, median, q3 = np.nanpercentile(values, [25, 50, 75], axis=0)
+        
+        for j, column in enumerate(numeric_columns):
+            stats_dict[column] = {
+                "count": int(counts[j]),
+                "mean": float(means[j]),
+                "std": float(stds[j]),
+                "min": float(minimums[j]),
+                "25%": float(q1[j]),
+                "50%": float(median[j]),
+                "75%": float(q3[j]),
+                "max": float(maximums[j]),
+                "skewness": float(skewness[j]),
+                "kurtosis": float(kurtosis[j])
+            }
         
         return stats_dict
     
-    def find_correlations(self, df: pd.DataFrame, threshold: float = 0.7) -> Dict:
+    def find_correlations(self, df: pd.DataFrame, threshold: float = 0.7,
+                          profile: Optional[Dict] = None) -> Dict:
         """Find correlations between numeric variables"""
-        numeric_df = df.select_dtypes(include=[np.number])
+        numeric_df = df[profile["numeric_cols"]] if profile else df.select_dtypes(include=[np.number])
         
         if numeric_df.shape[1] < 2:
             return {"message": "Not enough numeric columns for correlation analysis"}
         
         # Calculate correlation matrix
-        corr_matrix = numeric_df.corr()
-        
-        # Find high correlations
-        high_correlations = []
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i + 1, len(corr_matrix.columns)):
-                corr_value = corr_matrix.iloc[i, j]
-                if abs(corr_value) >= threshold:
-                    high_correlations.append({
-                        "variable1": corr_matrix.columns[i],
-                        "variable2": corr_matrix.columns[j],
-                        "correlation": round(corr_value, 3),
-                        "strength": "strong" if abs(corr_value) > 0.8 else "moderate"
-                    })
+        columns = numeric_df.columns
+        values = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+        if np.isnan(values).any():
+            # Pairwise-complete correlations when values are missing
+            corr_matrix = numeric_df.corr()
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr_matrix = pd.DataFrame(np.corrcoef(values, rowvar=False), index=columns, columns=columns)
+        
+        # Find high correlations in the upper triangle
+        rows, cols = np.triu_indices(len(columns), k=1)
+        pair_corr = corr_matrix.to_numpy()[rows, cols]
+        high = np.abs(pair_corr) >= threshold
+        high_correlations = [
+            {
+                "variable1": columns[i],
+                "variable2": columns[j],
+                "correlation": round(corr_value, 3),
+                "strength": "strong" if abs(corr_value) > 0.8 else "moderate"
+            }
+            for i, j, corr_value in zip(rows[high], cols[high], pair_corr[high])
+        ]
         
         return {
             "correlation_matrix": corr_matrix.to_dict(),
@@ -122,46 +228,52 @@ class AnalysisService:
             "threshold_used": threshold
         }
     
-    def identify_key_variables(self, df: pd.DataFrame, target: Optional[str] = None) -> List[Dict]:
+    def identify_key_variables(self, df: pd.DataFrame, target: Optional[str] = None,
+                               profile: Optional[Dict] = None) -> List[Dict]:
         """Identify potentially important variables"""
-        key_variables = []
+        # Keyed by variable so each keeps its first reason; dicts preserve insertion order
+        key_variables = {}
         
         # Variables with high completeness
-        for column in df.columns:
-            missing_pct = (df[column].isnull().sum() / len(df)) * 100
-            
-            if missing_pct < 5:  # Less than 5% missing
-                key_variables.append({
-                    "variable": column,
-                    "reason": "high_completeness",
-                    "missing_percentage": round(missing_pct, 2)
-                })
+        null_counts = profile["null_counts"] if profile else df.isnull().sum()
+        missing_pcts = null_counts / len(df) * 100
+        for column, missing_pct in missing_pcts[missing_pcts < 5].items():  # Less than 5% missing
+            key_variables[column] = {
+                "variable": column,
+                "reason": "high_completeness",
+                "missing_percentage": round(missing_pct, 2)
+            }
         
         # If target is specified, find variables correlated with target
-        if target and target in df.columns and df[target].dtype in ['int64', 'float64']:
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
+        if target and target in df.columns and df[target].dtype.kind in 'iuf':
+            numeric_cols = profile["numeric_cols"] if profile else df.select_dtypes(include=[np.number]).columns
+            numeric_df = df[numeric_cols.drop(target)]
+            values = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+            y = df[target].to_numpy(dtype=np.float64, na_value=np.nan)
+            
+            if np.isnan(values).any() or np.isnan(y).any():
+                # Pairwise-complete correlations when values are missing
+                correlations = numeric_df.corrwith(df[target]).to_numpy()
+            else:
+                # Correlation of every column with the target in one matrix-vector product
+                centered = values - values.mean(axis=0)
+                y_centered = y - y.mean()
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    correlations = (centered.T @ y_centered) / (
+                        np.linalg.norm(centered, axis=0) * np.linalg.norm(y_centered)
+                    )
             
-            for col in numeric_cols:
-                if col != target:
-                    correlation = df[col].corr(df[target])
-                    if abs(correlation) > 0.3:
-                        key_variables.append({
-                            "variable": col,
-                            "reason": "correlated_with_target",
-                            "correlation": round(correlation, 3)
-                        })
-        
-        # Remove duplicates
-        seen = set()
-        unique_key_vars = []
-        for var in key_variables:
-            if var["variable"] not in seen:
-                seen.add(var["variable"])
-                unique_key_vars.append(var)
-        
-        return unique_key_vars
+            for col, correlation in zip(numeric_df.columns, correlations):
+                if abs(correlation) > 0.3 and col not in key_variables:
+                    key_variables[col] = {
+                        "variable": col,
+                        "reason": "correlated_with_target",
+                        "correlation": round(correlation, 3)
+                    }
+        
+        return list(key_variables.values())
     
-    def detect_patterns(self, df: pd.DataFrame) -> Dict:
+    def detect_patterns(self, df: pd.DataFrame, profile: Optional[Dict] = None) -> Dict:
         """Detect patterns in the data"""
         patterns = {
             "missing_patterns": {},
@@ -170,37 +282,56 @@ class AnalysisService:
         }
         
         # Missing data patterns
-        missing_cols = df.columns[df.isnull().any()].tolist()
+        null_mask = profile["null_mask"] if profile else df.isnull()
+        missing_cols = df.columns[null_mask.any().to_numpy()].tolist()
         if len(missing_cols) > 1:
-            # Check if missing values occur together
-            missing_together = []
-            for i in range(len(missing_cols)):
-                for j in range(i + 1, len(missing_cols)):
-                    col1, col2 = missing_cols[i], missing_cols[j]
-                    both_missing = df[col1].isnull() & df[col2].isnull()
-                    if both_missing.sum() > 0:
-                        missing_together.append({
-                            "columns": [col1, col2],
-                            "count": int(both_missing.sum()),
-                            "percentage": round((both_missing.sum() / len(df)) * 100, 2)
-                        })
+            # Check if missing values occur together: one matrix product gives every
+            # pair's joint missing count (float so it goes through BLAS; counts stay exact)
+            missing = null_mask[missing_cols].to_numpy(dtype=np.float64)
+            co_missing = missing.T @ missing
+            rows, cols = np.triu_indices(len(missing_cols), k=1)
+            pair_counts = co_missing[rows, cols]
+            together = pair_counts > 0
+            missing_together = [
+                {
+                    "columns": [missing_cols[i], missing_cols[j]],
+                    "count": int(count),
+                    "percentage": round((count / len(df)) * 100, 2)
+                }
+                for i, j, count in zip(rows[together], cols[together], pair_counts[together])
+            ]
             
             patterns["missing_patterns"]["co_occurring"] = missing_together
         
         # Value patterns (for categorical variables)
-        for column in df.select_dtypes(include=['object']).columns:
-            value_counts = df[column].value_counts()
+        object_cols = profile["object_cols"] if profile else df.select_dtypes(include=['object', 'category']).columns
+        low_cardinality = {}
+        for column in object_cols:
+            value_counts = self._value_counts(df, column, profile)
             if len(value_counts) < 20:  # Only for low-cardinality columns
+                low_cardinality[column] = value_counts
+        
+        if low_cardinality:
+            # Entropies for all columns at once from zero-padded count rows
+            counts = np.zeros((len(low_cardinality), 20))
+            for i, value_counts in enumerate(low_cardinality.values()):
+                counts[i, :len(value_counts)] = value_counts.to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                probabilities = counts / counts.sum(axis=1, keepdims=True)
+                entropies = np.where(counts > 0, -probabilities * np.log(probabilities), 0.0).sum(axis=1)
+            
+            for (column, value_counts), entropy in zip(low_cardinality.items(), entropies):
                 patterns["value_patterns"][column] = {
                     "distribution": value_counts.to_dict(),
                     "mode": value_counts.index[0] if len(value_counts) > 0 else None,
-                    "entropy": stats.entropy(value_counts)
+                    "entropy": entropy
                 }
         
         return patterns
     
     def create_summary_report(self, df: pd.DataFrame) -> Dict:
         """Create a comprehensive summary report"""
+        profile = self._profile(df)
         return {
             "dataset_info": {
                 "rows": len(df),
@@ -208,9 +339,9 @@ class AnalysisService:
                 "memory_usage": df.memory_usage(deep=True).sum() / 1024**2,  # MB
                 "column_names": df.columns.tolist()
             },
-            "variable_types": self.identify_variable_types(df),
-            "descriptive_stats": self.calculate_descriptive_stats(df),
-            "correlations": self.find_correlations(df),
-            "key_variables": self.identify_key_variables(df),
-            "patterns": self.detect_patterns(df)
+            "variable_types": self.identify_variable_types(df, profile=profile),
+            "descriptive_stats": self.calculate_descriptive_stats(df, profile=profile),
+            "correlations": self.find_correlations(df, profile=profile),
+            "key_variables": self.identify_key_variables(df, profile=profile),
+            "patterns": self.detect_patterns(df, profile=profile)
         }
\ No newline at end of file
@@ -12,10 +12,12 @@ class CleansingService:
         """Analyze missing data patterns"""
         analysis = {}
         
-        for column in df.columns:
-            missing_count = df[column].isnull().sum()
-            total_count = len(df)
-            missing_pct = (missing_count / total_count) * 100
+        # Null counts for every column in one pass
+        null_counts = df.isnull().sum().to_numpy()
+        total_count = len(df)
+        missing_pcts = null_counts / total_count * 100
+        
+        for column, missing_count, missing_pct in zip(df.columns, null_counts, missing_pcts):
             
             analysis[column] = {
                 "missing_count": int(missing_count),
@@ -38,75 +40,103 @@ class CleansingService:
         
         return analysis
     
+    @staticmethod
+    def _iqr_bounds(values: np.ndarray):
+        """1.5 * IQR fences, per column for a 2-D array"""
+        # Both quartiles from one quantile call, i.e. one partition per column
+        q1, q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+        iqr = q3 - q1
+        return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    
     def detect_outliers(self, df: pd.DataFrame) -> Dict:
         """Detect outliers using IQR method"""
         outliers = {}
         
-        for column in df.select_dtypes(include=[np.number]).columns:
-            Q1 = df[column].quantile(0.25)
-            Q3 = df[column].quantile(0.75)
-            IQR = Q3 - Q1
-            
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            
-            outlier_mask = (df[column] < lower_bound) | (df[column] > upper_bound)
-            outlier_count = outlier_mask.sum()
+        numeric = df.select_dtypes(include=[np.number])
+        # All-missing columns have no quartiles and no outliers
+        numeric = numeric.loc[:, numeric.notna().any()]
+        if numeric.empty:
+            return outliers
+        
+        # One column-major block so each column's values are contiguous for the quantiles
+        values = np.asfortranarray(numeric.to_numpy(dtype=np.float64, na_value=np.nan))
+        lower_bounds, upper_bounds = self._iqr_bounds(values)
+        # Both comparisons land in one mask array, with no temporary for the OR
+        outlier_mask = values < lower_bounds
+        outlier_mask |= values > upper_bounds
+        outlier_counts = outlier_mask.sum(axis=0)
+        
+        for j, column in enumerate(numeric.columns):
+            outlier_count = outlier_counts[j]
             
             if outlier_count > 0:
                 outliers[column] = {
                     "count": int(outlier_count),
                     "percentage": round((outlier_count / len(df)) * 100, 2),
-                    "lower_bound": round(lower_bound, 2),
-                    "upper_bound": round(upper_bound, 2),
-                    "outlier_indices": df[outlier_mask].index.tolist()[:10]  # First 10
+                    "lower_bound": round(lower_bounds[j], 2),
+                    "upper_bound": round(upper_bounds[j], 2),
+                    "outlier_indices": df.index[np.flatnonzero(outlier_mask[:, j])[:10]].tolist()  # First 10
                 }
         
         return outliers
     
     def impute_missing_values(self, df: pd.DataFrame, strategies: Dict) -> pd.DataFrame:
         """Apply imputation strategies to handle missing values"""
-        df_imputed = df.copy()
+        # Shallow copy: columns are replaced rather than written in place, so
+        # untouched columns keep sharing the caller's arrays
+        df_imputed = df.copy(deep=False)
+        
+        knn_cols = [column for column, strategy in strategies.items() if strategy == "knn"]
+        knn_done = False
         
         for column, strategy in strategies.items():
             if column not in df_imputed.columns:
                 continue
             
             if strategy == "mean" and df_imputed[column].dtype in ['float64', 'int64']:
-                df_imputed[column].fillna(df_imputed[column].mean(), inplace=True)
+                df_imputed[column] = df_imputed[column].fillna(df_imputed[column].mean())
             
             elif strategy == "median" and df_imputed[column].dtype in ['float64', 'int64']:
-                df_imputed[column].fillna(df_imputed[column].median(), inplace=True)
+                df_imputed[column] = df_imputed[column].fillna(df_imputed[column].median())
             
             elif strategy == "mode":
                 mode_value = df_imputed[column].mode()
                 if not mode_value.empty:
-                    df_imputed[column].fillna(mode_value[0], inplace=True)
+                    df_imputed[column] = df_imputed[column].fillna(mode_value[0])
             
             elif strategy == "forward_fill":
-                df_imputed[column].fillna(method='ffill', inplace=True)
+                df_imputed[column] = df_imputed[column].ffill()
             
             elif strategy == "backward_fill":
-                df_imputed[column].fillna(method='bfill', inplace=True)
+                df_imputed[column] = df_imputed[column].bfill()
             
             elif strategy == "knn" and df_imputed[column].dtype in ['float64', 'int64']:
-                # Use KNN imputation
-                numeric_cols = df_imputed.select_dtypes(include=[np.number]).columns
-                imputer = KNNImputer(n_neighbors=5)
-                df_imputed[numeric_cols] = imputer.fit_transform(df_imputed[numeric_cols])
+                # Use KNN imputation, fitted once for every KNN column on the first one reached
+                if not knn_done:
+                    numeric_cols = df_imputed.select_dtypes(include=[np.number]).columns
+                    # All-missing columns would be dropped from the imputer's output
+                    numeric_cols = numeric_cols[df_imputed[numeric_cols].notna().any().to_numpy()]
+                    targets = [col for col in knn_cols if col in numeric_cols]
+                    if targets:
+                        imputer = KNNImputer(n_neighbors=5)
+                        imputed = imputer.fit_transform(df_imputed[numeric_cols])
+                        positions = numeric_cols.get_indexer(targets)
+                        df_imputed[targets] = imputed[:, positions]
+                    knn_done = True
             
             elif strategy == "drop":
                 df_imputed = df_imputed.dropna(subset=[column])
             
             else:
                 # Custom value
-                df_imputed[column].fillna(strategy, inplace=True)
+                df_imputed[column] = df_imputed[column].fillna(strategy)
         
         return df_imputed
     
     def handle_outliers(self, df: pd.DataFrame, strategies: Dict) -> pd.DataFrame:
         """Handle outliers based on specified strategies"""
-        df_processed = df.copy()
+        # Shallow copy: capped columns are replaced, not clipped in place
+        df_processed = df.copy(deep=False)
         
         for column, strategy in strategies.items():
             if column not in df_processed.columns:
@@ -116,11 +146,9 @@ class CleansingService:
                 continue
             
             if strategy == "remove":
-                Q1 = df_processed[column].quantile(0.25)
-                Q3 = df_processed[column].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
+                lower_bound, upper_bound = self._iqr_bounds(
+                    df_processed[column].to_numpy(dtype=np.float64, na_value=np.nan)
+                )
                 
                 df_processed = df_processed[
                     (df_processed[column] >= lower_bound) & 
@@ -128,11 +156,9 @@ class CleansingService:
                 ]
             
             elif strategy == "cap":
-                Q1 = df_processed[column].quantile(0.25)
-                Q3 = df_processed[column].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
+                lower_bound, upper_bound = self._iqr_bounds(
+                    df_processed[column].to_numpy(dtype=np.float64, na_value=np.nan)
+                )
                 
                 df_processed[column] = df_processed[column].clip(
                     lower=lower_bound, 
@@ -141,8 +167,8 @@ class CleansingService:
             
             elif strategy == "winsorize":
                 # Cap at 5th and 95th percentile
-                lower_bound = df_processed[column].quantile(0.05)
-                upper_bound = df_processed[column].quantile(0.95)
+                values = df_processed[column].to_numpy(dtype=np.float64, na_value=np.nan)
+                lower_bound, upper_bound = np.nanquantile(values, [0.05, 0.95])
                 df_processed[column] = df_processed[column].clip(
                     lower=lower_bound,
                     upper=upper_bound
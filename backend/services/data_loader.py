@@ -0,0 +1,184 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import io
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+from config.settings import settings
+
+# Arrow CSV read block size; larger blocks mean fewer, bigger parallel chunks
+CSV_BLOCK_SIZE = 8 << 20
+
+# Decoded Parquet tables by path (instance and stage), least recently used first:
+# path -> (mtime_ns, loaded_at, table). Stage endpoints read from worker threads, hence the lock.
+_table_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_table_cache_lock = threading.Lock()
+
+class DataLoader:
+    """Loads stage data files into DataFrames and Arrow tables"""
+
+    @staticmethod
+    def open_source(source: Union[str, bytes]):
+        """Wrap raw bytes in a fresh buffer so each parse attempt starts at offset 0"""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return io.BytesIO(source)
+        return source
+
+    @staticmethod
+    def read_csv(source: Union[str, bytes], **kwargs) -> pd.DataFrame:
+        """Read a CSV with the multithreaded pyarrow engine, falling back to the C parser"""
+        try:
+            return pd.read_csv(DataLoader.open_source(source), engine='pyarrow', **kwargs)
+        except Exception as e:
+            print(f"pyarrow CSV engine failed, falling back to C engine: {str(e)[:100]}")
+            return pd.read_csv(DataLoader.open_source(source), engine='c', low_memory=False, **kwargs)
+
+    @staticmethod
+    def read_csv_table(source: Union[str, bytes], encoding: Optional[str] = None,
+                       column_types: Optional[Dict[str, pa.DataType]] = None) -> pa.Table:
+        """Read a CSV straight into an Arrow table, falling back to pandas for files Arrow rejects"""
+        try:
+            table = pacsv.read_csv(
+                DataLoader.open_source(source),
+                read_options=pacsv.ReadOptions(
+                    block_size=CSV_BLOCK_SIZE,
+                    encoding=encoding or 'utf8'
+                ),
+                # Match pandas, which reads empty fields as missing
+                convert_options=pacsv.ConvertOptions(
+                    strings_can_be_null=True,
+                    column_types=column_types
+                )
+            )
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            # e.g. a column whose type changes after the first block, or ragged rows
+            print(f"Arrow CSV reader failed, falling back to pandas: {str(e)[:100]}")
+            kwargs = {'encoding': encoding} if encoding else {}
+            # Arrow-backed columns convert to a table without copying or boxing strings
+            return DataLoader.to_arrow(DataLoader.read_csv(source, dtype_backend='pyarrow', **kwargs))
+        
+        # Arrow infers text that is not valid in the chosen encoding as binary
+        for field in table.schema:
+            if pa.types.is_binary(field.type):
+                raise UnicodeDecodeError(
+                    encoding or 'utf8', b"", 0, 1, f"column {field.name!r} is not valid text"
+                )
+        return table
+
+    @staticmethod
+    def arrow_types(dtypes: Dict[str, str]) -> Dict[str, pa.DataType]:
+        """Turn profiled Arrow type names (e.g. 'int64', 'double') back into types, skipping unknown ones"""
+        column_types = {}
+        for col, dtype in dtypes.items():
+            try:
+                column_types[col] = pa.type_for_alias(dtype)
+            except ValueError:
+                continue
+        return column_types
+
+    @staticmethod
+    def read_csv_head(path: str, rows: int) -> pa.Table:
+        """Read only the leading rows of a CSV by streaming record batches"""
+        reader = pacsv.open_csv(
+            path,
+            convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+        )
+        batches = []
+        remaining = rows
+        while remaining > 0:
+            try:
+                batch = reader.read_next_batch()
+            except StopIteration:
+                break
+            batches.append(batch)
+            remaining -= batch.num_rows
+        return pa.Table.from_batches(batches, schema=reader.schema).slice(0, max(rows, 0))
+
+    @staticmethod
+    def to_arrow(df: pd.DataFrame) -> pa.Table:
+        """Convert a DataFrame to an Arrow table"""
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowTypeError, pa.ArrowInvalid) as e:
+            # Arrow needs a single type per column; stringify mixed object columns (e.g. from Excel)
+            print(f"Coercing mixed-type columns for Arrow: {str(e)[:100]}")
+            df = df.copy()
+            for col in df.select_dtypes(include=['object']).columns:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+            return pa.Table.from_pandas(df, preserve_index=False)
+
+    @staticmethod
+    def write_parquet(data: Union[pd.DataFrame, pa.Table], path: str) -> str:
+        """Persist a DataFrame or Arrow table as Snappy-compressed Parquet"""
+        table = DataLoader.to_arrow(data) if isinstance(data, pd.DataFrame) else data
+        pq.write_table(table, path, compression='snappy')
+        # Release the previous version now rather than when it ages out
+        with _table_cache_lock:
+            _table_cache.pop(path, None)
+        return path
+
+    @staticmethod
+    def read_parquet_table(path: str) -> pa.Table:
+        """Read a Parquet stage artifact as an Arrow table, reusing the decoded table while the file is unchanged"""
+        mtime_ns = os.stat(path).st_mtime_ns
+        now = time.monotonic()
+        with _table_cache_lock:
+            entry = _table_cache.get(path)
+            if entry and entry[0] == mtime_ns and now - entry[1] < settings.dataframe_cache_ttl:
+                _table_cache.move_to_end(path)
+                return entry[2]
+        
+        table = pq.read_table(path)
+        with _table_cache_lock:
+            _table_cache[path] = (mtime_ns, now, table)
+            _table_cache.move_to_end(path)
+            # Drop expired tables, then the least recently used beyond the cap
+            for cached_path, (_, loaded_at, _) in list(_table_cache.items()):
+                if now - loaded_at >= settings.dataframe_cache_ttl:
+                    del _table_cache[cached_path]
+            while len(_table_cache) > settings.dataframe_cache_size:
+                _table_cache.popitem(last=False)
+        return table
+
+    @staticmethod
+    def read_parquet(path: str) -> pd.DataFrame:
+        """Read a Parquet stage artifact"""
+        # Arrow tables are immutable, so callers get their own DataFrame to modify
+        return DataLoader.read_parquet_table(path).to_pandas()
+
+    @staticmethod
+    def numeric_columns(table: pa.Table) -> List[str]:
+        """Names of the integer and floating-point columns, i.e. those pandas treats as numeric"""
+        return [
+            field.name for field in table.schema
+            if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+        ]
+
+    @staticmethod
+    def pandas_dtypes(table: pa.Table) -> Dict[str, str]:
+        """Names of the pandas dtypes the table's columns convert to, without converting any data"""
+        dtypes = {}
+        for (col, dtype), field, column in zip(
+            table.slice(0, 0).to_pandas().dtypes.items(), table.schema, table.columns
+        ):
+            dtype = str(dtype)
+            # Integer and boolean columns with nulls become float64 and object in pandas
+            if column.null_count and pa.types.is_integer(field.type):
+                dtype = 'float64'
+            elif column.null_count and pa.types.is_boolean(field.type):
+                dtype = 'object'
+            dtypes[col] = dtype
+        return dtypes
+
+    @staticmethod
+    def read_parquet_head(path: str, rows: int) -> pa.Table:
+        """Read only the leading rows of a Parquet file without decoding the rest"""
+        parquet_file = pq.ParquetFile(path)
+        batch = next(parquet_file.iter_batches(batch_size=max(rows, 1)), None)
+        if batch is None:
+            return parquet_file.schema_arrow.empty_table()
+        return pa.Table.from_batches([batch]).slice(0, max(rows, 0))
@@ -1,26 +1,41 @@
 from clickhouse_driver import Client
 from typing import Dict, List, Any, Optional
+import asyncio
 import uuid
 from datetime import datetime
 from config.settings import settings
-import json
+import orjson
+
+def _dump_json(obj) -> str:
+    """Serialize a dict for a JSON String column, numpy values included"""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
 
 class DatabaseService:
     def __init__(self):
         self.client = None
+        self.clients: List[Client] = []
+        self._idle_clients: Optional[asyncio.Queue] = None
         
     async def initialize(self):
         """Initialize ClickHouse connection"""
         try:
-            self.client = Client(
-                host=settings.clickhouse_host,
-                port=settings.clickhouse_port,
-                user=settings.clickhouse_user,
-                password=settings.clickhouse_password,
-                database=settings.clickhouse_database
-            )
+            # A Client runs one query at a time, so concurrent requests each take their own
+            self.clients = [
+                Client(
+                    host=settings.clickhouse_host,
+                    port=settings.clickhouse_port,
+                    user=settings.clickhouse_user,
+                    password=settings.clickhouse_password,
+                    database=settings.clickhouse_database
+                )
+                for _ in range(max(settings.clickhouse_pool_size, 1))
+            ]
+            self.client = self.clients[0]
+            self._idle_clients = asyncio.Queue()
+            for client in self.clients:
+                self._idle_clients.put_nowait(client)
             # Test connection
-            result = self.client.execute("SELECT 1")
+            result = await self._execute("SELECT 1")
             print(f"Connected to ClickHouse: {settings.clickhouse_database}")
         except Exception as e:
             print(f"Failed to connect to ClickHouse: {e}")
@@ -28,8 +43,22 @@ class DatabaseService:
     
     async def close(self):
         """Close database connection"""
-        if self.client:
-            self.client.disconnect()
+        for client in self.clients:
+            client.disconnect()
+    
+    async def _execute(self, query: str, params: Any = None, **kwargs):
+        """Run a query on a pooled client in a worker thread, keeping the event loop free"""
+        client = await self._idle_clients.get()
+        try:
+            return await asyncio.to_thread(client.execute, query, params, **kwargs)
+        finally:
+            self._idle_clients.put_nowait(client)
+    
+    async def _fetch_dicts(self, query: str, params: Any = None) -> List[Dict]:
+        """Run a SELECT and return its rows as dicts keyed by column name"""
+        rows, column_types = await self._execute(query, params, with_column_types=True)
+        names = [name for name, _ in column_types]
+        return [dict(zip(names, row)) for row in rows]
     
     # Document operations
     async def create_document(self, data: Dict, document_id: str = None) -> str:
@@ -46,7 +75,7 @@ class DatabaseService:
         """
         
         try:
-            self.client.execute(
+            await self._execute(
                 query + " (%(document_id)s, %(document_name)s, %(original_filename)s, %(file_path)s, "
                 "%(file_size)s, %(file_type)s, %(user_id)s, %(organization)s, %(survey_type)s, "
                 "%(row_count)s, %(column_count)s, %(metadata)s)",
@@ -62,7 +91,7 @@ class DatabaseService:
                     'survey_type': data.get('survey_type', ''),
                     'row_count': data.get('row_count', 0),
                     'column_count': data.get('column_count', 0),
-                    'metadata': json.dumps(data.get('metadata', {}))
+                    'metadata': _dump_json(data.get('metadata', {}))
                 }
             )
         except Exception as e:
@@ -73,24 +102,19 @@ class DatabaseService:
     
     async def get_document(self, document_id: str) -> Optional[Dict]:
         """Get document by ID"""
-        query = "SELECT * FROM documents WHERE document_id = %(document_id)s"
-        result = self.client.execute(query, {'document_id': document_id})
+        query = """
+        SELECT document_id, document_name, original_filename, upload_date,
+               file_path, file_size, file_type, status, row_count, column_count, metadata
+        FROM documents
+        WHERE document_id = %(document_id)s
+        """
+        result = await self._fetch_dicts(query, {'document_id': document_id})
         
         if result:
-            row = result[0]
-            return {
-                'document_id': str(row[0]),
-                'document_name': row[1],
-                'original_filename': row[2],
-                'upload_date': row[3],
-                'file_path': row[4],
-                'file_size': row[5],
-                'file_type': row[6],
-                'status': row[12],
-                'row_count': row[13],
-                'column_count': row[14],
-                'metadata': json.loads(row[15]) if row[15] else {}
-            }
+            document = result[0]
+            document['document_id'] = str(document['document_id'])
+            document['metadata'] = orjson.loads(document['metadata']) if document['metadata'] else {}
+            return document
         return None
     
     # Workflow operations
@@ -104,7 +128,7 @@ class DatabaseService:
         ) VALUES
         """
         
-        self.client.execute(
+        await self._execute(
             query + " (%(workflow_id)s, %(document_id)s, %(workflow_name)s, "
             "%(created_by)s, %(last_modified_by)s, %(configuration)s, %(metadata)s)",
             {
@@ -127,23 +151,18 @@ class DatabaseService:
         """Initialize all stages for a workflow"""
         stages = settings.stage_names
         
-        for stage_num, stage_name in stages.items():
-            stage_id = str(uuid.uuid4())
-            query = """
+        # All stage rows go to the server as one native insert block; stage_id is
+        # left to the column default (generateUUIDv4()) since nothing reads it back
+        await self._execute(
+            """
             INSERT INTO workflow_stages (
-                stage_id, workflow_id, document_id, stage_number,
+                workflow_id, document_id, stage_number,
                 stage_name, stage_type, status, input_data, output_data,
                 user_actions, automated_actions, validation_results
             ) VALUES
-            """
-            
-            self.client.execute(
-                query + " (%(stage_id)s, %(workflow_id)s, %(document_id)s, "
-                "%(stage_number)s, %(stage_name)s, %(stage_type)s, %(status)s, "
-                "%(input_data)s, %(output_data)s, %(user_actions)s, "
-                "%(automated_actions)s, %(validation_results)s)",
+            """,
+            [
                 {
-                    'stage_id': stage_id,
                     'workflow_id': workflow_id,
                     'document_id': document_id,
                     'stage_number': stage_num,
@@ -156,118 +175,142 @@ class DatabaseService:
                     'automated_actions': '{}',
                     'validation_results': '{}'
                 }
-            )
+                for stage_num, stage_name in stages.items()
+            ]
+        )
     
     async def get_workflow(self, workflow_id: str) -> Optional[Dict]:
         """Get workflow details"""
-        query = "SELECT * FROM workflows WHERE workflow_id = %(workflow_id)s"
-        result = self.client.execute(query, {'workflow_id': workflow_id})
+        query = """
+        SELECT workflow_id, document_id, workflow_name, current_stage,
+               total_stages, status, started_at, completed_at
+        FROM workflows
+        WHERE workflow_id = %(workflow_id)s
+        """
+        result = await self._fetch_dicts(query, {'workflow_id': workflow_id})
         
         if result:
-            row = result[0]
-            return {
-                'workflow_id': str(row[0]),
-                'document_id': str(row[1]),
-                'workflow_name': row[2],
-                'current_stage': row[3],
-                'total_stages': row[4],
-                'status': row[5],
-                'started_at': row[6],
-                'completed_at': row[7]
-            }
+            workflow = result[0]
+            workflow['workflow_id'] = str(workflow['workflow_id'])
+            workflow['document_id'] = str(workflow['document_id'])
+            
+            # The current stage follows the most recently completed stage
+            completed = await self._execute(
+                """
+                SELECT argMax(stage_number, event_time)
+                FROM workflow_stage_events
+                WHERE workflow_id = %(workflow_id)s AND status = 'completed'
+                  AND stage_number < %(total_stages)s
+                GROUP BY workflow_id
+                """,
+                {'workflow_id': workflow_id, 'total_stages': settings.total_stages}
+            )
+            if completed:
+                workflow['current_stage'] = completed[0][0] + 1
+            
+            return workflow
         return None
     
     async def get_workflow_stages(self, workflow_id: str) -> List[Dict]:
         """Get all stages for a workflow"""
+        # Stage rows hold the initial state; the latest event, if any, overrides it
         query = """
-        SELECT stage_number, stage_name, status, started_at, completed_at
-        FROM workflow_stages
-        WHERE workflow_id = %(workflow_id)s
-        ORDER BY stage_number
+        SELECT
+            s.stage_number,
+            s.stage_name,
+            if(e.events > 0, e.latest_status, s.status) AS status,
+            if(e.events > 0, e.last_event_at, s.started_at) AS started_at,
+            if(e.events > 0, e.last_completed_at, s.completed_at) AS completed_at
+        FROM workflow_stages AS s
+        LEFT JOIN (
+            SELECT
+                stage_number,
+                count() AS events,
+                argMax(status, event_time) AS latest_status,
+                toDateTime(max(event_time)) AS last_event_at,
+                toDateTime(maxIfOrNull(event_time, status = 'completed')) AS last_completed_at
+            FROM workflow_stage_events
+            WHERE workflow_id = %(workflow_id)s
+            GROUP BY stage_number
+        ) AS e ON s.stage_number = e.stage_number
+        WHERE s.workflow_id = %(workflow_id)s
+        ORDER BY s.stage_number
         """
         
-        result = self.client.execute(query, {'workflow_id': workflow_id})
-        
-        stages = []
-        for row in result:
-            stages.append({
-                'stage_number': row[0],
-                'stage_name': row[1],
-                'status': row[2],
-                'started_at': row[3],
-                'completed_at': row[4]
-            })
-        
-        return stages
+        return await self._fetch_dicts(query, {'workflow_id': workflow_id})
     
     async def update_stage_status(self, workflow_id: str, stage_number: int, 
                                   status: str, data: Dict = None) -> bool:
         """Update stage status and data"""
-        updates = ["status = %(status)s", "started_at = now()"]
-        params = {'workflow_id': workflow_id, 'stage_number': stage_number, 'status': status}
-        
-        if status == 'completed':
-            updates.append("completed_at = now()")
-        
-        if data:
-            if 'output_data' in data:
-                updates.append("output_data = %(output_data)s")
-                params['output_data'] = json.dumps(data['output_data'])
-            if 'user_actions' in data:
-                updates.append("user_actions = %(user_actions)s")
-                params['user_actions'] = json.dumps(data['user_actions'])
-        
-        query = f"""
-        ALTER TABLE workflow_stages
-        UPDATE {', '.join(updates)}
-        WHERE workflow_id = %(workflow_id)s AND stage_number = %(stage_number)s
-        """
-        
-        self.client.execute(query, params)
+        # Status changes are appended as events rather than applied as mutations,
+        # which would rewrite whole parts of workflow_stages and workflows
+        data = data or {}
+        await self._execute(
+            """
+            INSERT INTO workflow_stage_events (
+                workflow_id, stage_number, status, output_data, user_actions
+            ) VALUES
+            """,
+            [{
+                'workflow_id': workflow_id,
+                'stage_number': stage_number,
+                'status': status,
+                'output_data': _dump_json(data['output_data']) if 'output_data' in data else None,
+                'user_actions': _dump_json(data['user_actions']) if 'user_actions' in data else None
+            }]
+        )
         
-        # Update workflow current stage
-        if status == 'completed' and stage_number < settings.total_stages:
-            self.client.execute(
-                "ALTER TABLE workflows UPDATE current_stage = %(next_stage)s "
-                "WHERE workflow_id = %(workflow_id)s",
-                {'workflow_id': workflow_id, 'next_stage': stage_number + 1}
-            )
+        return True
+    
+    async def complete_workflow(self, workflow_id: str) -> bool:
+        """Mark a workflow as completed"""
+        await self._execute(
+            "ALTER TABLE workflows UPDATE status = 'completed', completed_at = now() "
+            "WHERE workflow_id = %(workflow_id)s",
+            {'workflow_id': workflow_id}
+        )
         
         return True
     
     async def create_audit_log(self, data: Dict):
         """Create audit log entry"""
-        audit_id = str(uuid.uuid4())
+        await self.create_audit_logs([data])
+    
+    async def create_audit_logs(self, entries: List[Dict]):
+        """Create several audit log entries in a single insert"""
+        # audit_id comes from the column default (generateUUIDv4()) on the server
+        if not entries:
+            return
+        
         query = """
         INSERT INTO audit_log (
-            audit_id, document_id, workflow_id, stage_number,
+            document_id, workflow_id, stage_number,
             action_category, action_type, action_details, user_id,
             user_role, ip_address, user_agent, session_id,
             response_status, response_time_ms
         ) VALUES
         """
         
-        self.client.execute(
-            query + " (%(audit_id)s, %(document_id)s, %(workflow_id)s, "
-            "%(stage_number)s, %(action_category)s, %(action_type)s, "
-            "%(action_details)s, %(user_id)s, %(user_role)s, %(ip_address)s, "
-            "%(user_agent)s, %(session_id)s, %(response_status)s, %(response_time_ms)s)",
-            {
-                'audit_id': audit_id,
-                'document_id': data.get('document_id'),
-                'workflow_id': data.get('workflow_id'),
-                'stage_number': data.get('stage_number'),
-                'action_category': data.get('action_category', 'workflow'),
-                'action_type': data.get('action_type'),
-                'action_details': json.dumps(data.get('action_details', {})),
-                'user_id': data.get('user_id', 'system'),
-                'user_role': data.get('user_role', 'user'),
-                'ip_address': data.get('ip_address', ''),
-                'user_agent': data.get('user_agent', ''),
-                'session_id': data.get('session_id', ''),
-                'response_status': data.get('response_status', 'success'),
-                'response_time_ms': data.get('response_time_ms', 0)
-            }
+        await self._execute(
+            query,
+            [
+                {
+                    'document_id': data.get('document_id'),
+                    'workflow_id': data.get('workflow_id'),
+                    'stage_number': data.get('stage_number'),
+                    'action_category': data.get('action_category', 'workflow'),
+                    'action_type': data.get('action_type'),
+                    'action_details': _dump_json(data.get('action_details', {})),
+                    'user_id': data.get('user_id', 'system'),
+                    'user_role': data.get('user_role', 'user'),
+                    'ip_address': data.get('ip_address', ''),
+                    'user_agent': data.get('user_agent', ''),
+                    'session_id': data.get('session_id', ''),
+                    'response_status': data.get('response_status', 'success'),
+                    'response_time_ms': data.get('response_time_ms', 0)
+                }
+                for data in entries
+            ]
         )
 
 # Singleton instance
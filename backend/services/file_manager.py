@@ -1,26 +1,69 @@
 import os
 import shutil
-import json
-from typing import Dict, Optional
+import orjson
+import pandas as pd
+import pyarrow as pa
+from functools import lru_cache
+from typing import Dict, List, Optional
 from datetime import datetime
 from config.settings import settings
+from services.data_loader import DataLoader
+
+# Largest chunk handed to a single copy_file_range call
+COPY_CHUNK_SIZE = 1 << 30
+
+# Parsed instance metadata.json files: path -> (mtime_ns, metadata)
+_metadata_cache: Dict[str, tuple] = {}
+
+@lru_cache(maxsize=1024)
+def _stage_path(data_dir: str, instance_id: str, stage_num: Optional[int]) -> str:
+    """Joined instance/stage folder path; keyed on data_dir so a reconfigured data directory is honoured"""
+    instance_path = os.path.join(data_dir, instance_id)
+    
+    if stage_num and stage_num in settings.stage_folders:
+        return os.path.join(instance_path, settings.stage_folders[stage_num])
+    
+    return instance_path
 
 class FileManager:
     """Manages instance-based folder structure for workflows"""
     
+    @staticmethod
+    def _fast_copy(src: str, dst: str) -> str:
+        """Copy a file inside the kernel (reflink/server-side where the filesystem supports it), keeping its metadata"""
+        copied = False
+        if hasattr(os, "copy_file_range"):
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                try:
+                    while os.copy_file_range(fsrc.fileno(), fdst.fileno(), COPY_CHUNK_SIZE):
+                        pass
+                    copied = True
+                except OSError:
+                    # e.g. EXDEV/ENOSYS/EINVAL on older kernels or across filesystems
+                    pass
+        if not copied:
+            # shutil uses sendfile on Linux, then a buffered read/write loop
+            shutil.copyfile(src, dst)
+        shutil.copystat(src, dst)
+        return dst
+    
     @staticmethod
     def create_instance_folders(instance_id: str) -> Dict[str, str]:
         """Create folder structure for a new instance"""
-        instance_path = os.path.join(settings.data_dir, instance_id)
+        instance_path = FileManager.get_instance_path(instance_id)
         
-        # Create main instance folder
+        # Create main instance folder (and the data directory on first use)
         os.makedirs(instance_path, exist_ok=True)
         
-        # Create stage subfolders
+        # Create stage subfolders; their parent exists, so a bare mkdir is enough
+        # and skips the existence checks makedirs does for every path
         stage_paths = {}
-        for stage_num, folder_name in settings.stage_folders.items():
-            stage_path = os.path.join(instance_path, folder_name)
-            os.makedirs(stage_path, exist_ok=True)
+        for stage_num in settings.stage_folders:
+            stage_path = FileManager.get_instance_path(instance_id, stage_num)
+            try:
+                os.mkdir(stage_path)
+            except FileExistsError:
+                pass
             stage_paths[stage_num] = stage_path
         
         # Create metadata file
@@ -32,20 +75,16 @@ class FileManager:
         }
         
         metadata_path = os.path.join(instance_path, "metadata.json")
-        with open(metadata_path, "w") as f:
-            json.dump(metadata, f, indent=2, default=str)
+        # Serialize in one call and write once
+        with open(metadata_path, "wb") as f:
+            f.write(orjson.dumps(metadata, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         
         return stage_paths
     
     @staticmethod
     def get_instance_path(instance_id: str, stage_num: Optional[int] = None) -> str:
         """Get path for instance or specific stage folder"""
-        instance_path = os.path.join(settings.data_dir, instance_id)
-        
-        if stage_num and stage_num in settings.stage_folders:
-            return os.path.join(instance_path, settings.stage_folders[stage_num])
-        
-        return instance_path
+        return _stage_path(settings.data_dir, instance_id, stage_num)
     
     @staticmethod
     def save_stage_data(instance_id: str, stage_num: int, filename: str, 
@@ -60,12 +99,65 @@ class FileManager:
                 f.write(data)
         elif source_path:
             # Copy from existing file
-            shutil.copy2(source_path, file_path)
+            FileManager._fast_copy(source_path, file_path)
         else:
             raise ValueError("Either data or source_path must be provided")
         
         return file_path
     
+    @staticmethod
+    def save_stage_frame(instance_id: str, stage_num: int, name: str, df: pd.DataFrame) -> str:
+        """Save a DataFrame to a stage folder as <name>.parquet"""
+        stage_path = FileManager.get_instance_path(instance_id, stage_num)
+        return DataLoader.write_parquet(df, os.path.join(stage_path, f"{name}.parquet"))
+    
+    @staticmethod
+    def load_stage_table(instance_id: str, stage_num: int, name: str) -> Optional[pa.Table]:
+        """Load <name>.parquet from a stage folder, falling back to <name>.csv; None if neither exists"""
+        stage_path = FileManager.get_instance_path(instance_id, stage_num)
+        # Opening the file answers whether it exists; no separate existence check
+        try:
+            return DataLoader.read_parquet_table(os.path.join(stage_path, f"{name}.parquet"))
+        except FileNotFoundError:
+            pass
+        
+        # Instances processed before stage data was stored as Parquet
+        csv_path = os.path.join(stage_path, f"{name}.csv")
+        if os.path.exists(csv_path):
+            return DataLoader.read_csv_table(csv_path)
+        
+        return None
+    
+    @staticmethod
+    def load_original_table(instance_id: str) -> Optional[pa.Table]:
+        """Re-parse the original upload with the encoding and types profiled at stage 1; None if it was never profiled"""
+        stage_1_metadata = FileManager.load_stage_metadata(instance_id, 1)
+        file_info = stage_1_metadata.get("file_info", {})
+        if not file_info:
+            return None
+        
+        stage_path = FileManager.get_instance_path(instance_id, 1)
+        source_path = os.path.join(stage_path, f"original_{file_info['original_filename']}")
+        if file_info.get("file_type") == ".csv":
+            dtypes = stage_1_metadata.get("data_profile", {}).get("dtypes", {})
+            return DataLoader.read_csv_table(
+                source_path,
+                encoding=file_info.get("encoding"),
+                column_types=DataLoader.arrow_types(dtypes)
+            )
+        return DataLoader.to_arrow(pd.read_excel(source_path))
+    
+    @staticmethod
+    def load_stage_frame(instance_id: str, stage_num: int, name: str,
+                         columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """Load stage data as a DataFrame, optionally converting only the given columns"""
+        table = FileManager.load_stage_table(instance_id, stage_num, name)
+        if table is None:
+            return None
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+    
     @staticmethod
     def save_stage_metadata(instance_id: str, stage_num: int, metadata: Dict) -> str:
         """Save metadata for a specific stage"""
@@ -77,24 +169,41 @@ class FileManager:
         metadata["stage_number"] = stage_num
         metadata["stage_name"] = settings.stage_names.get(stage_num)
         
-        with open(metadata_file, "w") as f:
-            json.dump(metadata, f, indent=2, default=str)
+        with open(metadata_file, "wb") as f:
+            f.write(orjson.dumps(
+                metadata,
+                default=str,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            ))
         
         return metadata_file
     
     @staticmethod
-    def get_stage_files(instance_id: str, stage_num: int) -> Dict[str, str]:
-        """Get all files in a stage folder"""
+    def load_stage_metadata(instance_id: str, stage_num: int) -> Dict:
+        """Load metadata for a specific stage, or an empty dict if none was saved"""
         stage_path = FileManager.get_instance_path(instance_id, stage_num)
+        metadata_file = os.path.join(stage_path, "stage_metadata.json")
         
-        if not os.path.exists(stage_path):
+        try:
+            with open(metadata_file, "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
             return {}
+    
+    @staticmethod
+    def get_stage_files(instance_id: str, stage_num: int) -> Dict[str, str]:
+        """Get all files in a stage folder"""
+        stage_path = FileManager.get_instance_path(instance_id, stage_num)
         
         files = {}
-        for filename in os.listdir(stage_path):
-            file_path = os.path.join(stage_path, filename)
-            if os.path.isfile(file_path):
-                files[filename] = file_path
+        # scandir entries carry the file type, so no stat per file
+        try:
+            with os.scandir(stage_path) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        files[entry.name] = entry.path
+        except FileNotFoundError:
+            pass
         
         return files
     
@@ -113,43 +222,68 @@ class FileManager:
         )
         
         if os.path.exists(from_path):
-            shutil.copy2(from_path, to_path)
+            FileManager._fast_copy(from_path, to_path)
             return to_path
         else:
             raise FileNotFoundError(f"File {filename} not found in stage {from_stage}")
     
     @staticmethod
-    def create_stage_report(instance_id: str, stage_num: int) -> Dict:
-        """Create a summary report for a stage"""
+    def create_stage_report(instance_id: str, stage_num: int, sizes: bool = True) -> Dict:
+        """Create a summary report for a stage; without sizes, files are listed by name only and never stat'ed"""
         stage_path = FileManager.get_instance_path(instance_id, stage_num)
         
         report = {
             "stage_number": stage_num,
             "stage_name": settings.stage_names.get(stage_num),
             "files": [],
-            "total_size": 0
+            "total_size": 0 if sizes else None
         }
         
-        if os.path.exists(stage_path):
-            for filename in os.listdir(stage_path):
-                file_path = os.path.join(stage_path, filename)
-                if os.path.isfile(file_path):
+        # One directory pass; a missing stage folder simply has no files
+        try:
+            with os.scandir(stage_path) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    if not sizes:
+                        report["files"].append({"name": entry.name})
+                        continue
+                    # Size and mtime come from a single stat per file
+                    stat = entry.stat()
                     file_info = {
-                        "name": filename,
-                        "size": os.path.getsize(file_path),
-                        "modified": datetime.fromtimestamp(
-                            os.path.getmtime(file_path)
-                        ).isoformat()
+                        "name": entry.name,
+                        "size": stat.st_size,
+                        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
                     }
                     report["files"].append(file_info)
                     report["total_size"] += file_info["size"]
+        except FileNotFoundError:
+            pass
         
         return report
     
     @staticmethod
-    def get_instance_summary(instance_id: str) -> Dict:
-        """Get summary of all stages for an instance"""
-        instance_path = os.path.join(settings.data_dir, instance_id)
+    def _load_instance_metadata(metadata_path: str) -> Optional[Dict]:
+        """Parsed instance metadata.json, re-read only when its mtime changes; None if missing"""
+        try:
+            mtime_ns = os.stat(metadata_path).st_mtime_ns
+        except FileNotFoundError:
+            _metadata_cache.pop(metadata_path, None)
+            return None
+        
+        cached = _metadata_cache.get(metadata_path)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+        
+        with open(metadata_path, "rb") as f:
+            metadata = orjson.loads(f.read())
+        _metadata_cache[metadata_path] = (mtime_ns, metadata)
+        return metadata
+    
+    @staticmethod
+    def get_instance_summary(instance_id: str, details: bool = True) -> Dict:
+        """Get summary of all stages for an instance; without details, only whether each stage folder exists"""
+        instance_path = FileManager.get_instance_path(instance_id)
         
         if not os.path.exists(instance_path):
             return {"error": f"Instance {instance_id} not found"}
@@ -161,11 +295,21 @@ class FileManager:
         }
         
         # Load metadata if exists
-        metadata_path = os.path.join(instance_path, "metadata.json")
-        if os.path.exists(metadata_path):
-            with open(metadata_path, "r") as f:
-                metadata = json.load(f)
-                summary["created_at"] = metadata.get("created_at")
+        metadata = FileManager._load_instance_metadata(os.path.join(instance_path, "metadata.json"))
+        if metadata is not None:
+            summary["created_at"] = metadata.get("created_at")
+        
+        if not details:
+            # One listing of the instance folder answers presence for every stage
+            with os.scandir(instance_path) as entries:
+                folders = {entry.name for entry in entries if entry.is_dir()}
+            for stage_num, folder_name in settings.stage_folders.items():
+                summary["stages"][stage_num] = {
+                    "stage_number": stage_num,
+                    "stage_name": settings.stage_names.get(stage_num),
+                    "exists": folder_name in folders
+                }
+            return summary
         
         # Get info for each stage
         for stage_num, folder_name in settings.stage_folders.items():
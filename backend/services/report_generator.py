@@ -1,12 +1,134 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional
-import json
+import orjson
 from datetime import datetime
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
 import seaborn as sns
 import io
-import base64
+import gzip
+import binascii
+import xlsxwriter
+import jinja2
+from concurrent.futures import ThreadPoolExecutor
+
+# HTML report layout, compiled once; values are autoescaped when rendered
+_HTML_TEMPLATE = jinja2.Environment(autoescape=True).from_string("""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Survey Analysis Report</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; }
+        h1 { color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
+        h2 { color: #34495e; margin-top: 30px; }
+        table { border-collapse: collapse; width: 100%; margin: 20px 0; }
+        th, td { border: 1px solid #ddd; padding: 12px; text-align: left; }
+        th { background-color: #3498db; color: white; }
+        tr:nth-child(even) { background-color: #f2f2f2; }
+        .summary-box { background: #ecf0f1; padding: 20px; border-radius: 5px; margin: 20px 0; }
+        .chart { margin: 20px 0; text-align: center; }
+        .metadata { color: #7f8c8d; font-size: 0.9em; }
+    </style>
+</head>
+<body>
+    <h1>Survey Data Analysis Report</h1>
+    
+    <div class="metadata">
+        <p><strong>Document ID:</strong> {{ document_id }}</p>
+        <p><strong>Workflow ID:</strong> {{ workflow_id }}</p>
+        <p><strong>Generated:</strong> {{ generated_at }}</p>
+    </div>
+    
+    <div class="summary-box">
+        <h2>Executive Summary</h2>
+        <ul>
+            <li><strong>Total Records:</strong> {{ "{:,}".format(stats.total_records) }}</li>
+            <li><strong>Total Variables:</strong> {{ stats.total_columns }}</li>
+            <li><strong>Numeric Variables:</strong> {{ stats.numeric_columns }}</li>
+            <li><strong>Categorical Variables:</strong> {{ stats.categorical_columns }}</li>
+        </ul>
+    </div>
+    
+    <h2>Data Quality Summary</h2>
+    <table>
+        <tr>
+            <th>Variable</th>
+            <th>Type</th>
+            <th>Missing Count</th>
+            <th>Missing %</th>
+            <th>Unique Values</th>
+        </tr>
+        {%- for col, dtype, missing_count, unique_count, missing_pct in quality_rows %}
+        <tr>
+            <td>{{ col }}</td>
+            <td>{{ dtype }}</td>
+            <td>{{ missing_count }}</td>
+            <td>{{ "%.1f"|format(missing_pct) }}%</td>
+            <td>{{ unique_count }}</td>
+        </tr>
+        {%- endfor %}
+    </table>
+    
+    <h2>Descriptive Statistics</h2>
+    <table>
+        <tr>
+            <th>Variable</th>
+            <th>Mean</th>
+            <th>Std Dev</th>
+            <th>Min</th>
+            <th>25%</th>
+            <th>50%</th>
+            <th>75%</th>
+            <th>Max</th>
+        </tr>
+        {%- for col, count, mean, std, min, q1, median, q3, max in desc_rows %}
+        <tr>
+            <td>{{ col }}</td>
+            <td>{{ "%.2f"|format(mean) }}</td>
+            <td>{{ "%.2f"|format(std) }}</td>
+            <td>{{ "%.2f"|format(min) }}</td>
+            <td>{{ "%.2f"|format(q1) }}</td>
+            <td>{{ "%.2f"|format(median) }}</td>
+            <td>{{ "%.2f"|format(q3) }}</td>
+            <td>{{ "%.2f"|format(max) }}</td>
+        </tr>
+        {%- endfor %}
+    </table>
+    
+    <h2>Key Findings</h2>
+    <div class="summary-box">
+        <ul>
+            {%- for finding in findings %}
+            <li>{{ finding }}</li>
+            {%- endfor %}
+        </ul>
+    </div>
+    
+    <h2>Visualizations</h2>
+    {%- for chart in charts %}
+    <div class="chart">
+        <h3>{{ chart.title }}</h3>
+        <img src="data:image/png;base64,{{ chart.data }}" style="max-width: 800px;">
+    </div>
+    {%- endfor %}
+    
+    <h2>Appendix</h2>
+    <p>This report was automatically generated using the AI-Enhanced Data Preparation System (AIDEPS).</p>
+    <p>For detailed analysis and raw data, please refer to the source files in the instance folder.</p>
+</body>
+</html>
+""")
+
+# Chart resolution; 80 dpi keeps embedded PNGs small while staying legible at 800px wide
+CHART_DPI = 80
+# Rows drawn for charts; larger datasets are sampled down to this
+CHART_SAMPLE_SIZE = 10000
+
+# Renders report charts while the calling thread builds the HTML tables
+_chart_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report-charts")
 
 class ReportGenerator:
     """Service for generating reports (Stages 5-7)"""
@@ -72,181 +194,125 @@ class ReportGenerator:
                            workflow_id: str) -> str:
         """Generate HTML report"""
         
-        # Calculate basic statistics
-        stats = self._calculate_basic_stats(df)
+        profile = self._profile(df)
         
-        # Generate visualizations
-        charts = self._generate_charts(df)
+        # Generate visualizations in the background; Agg drawing and PNG
+        # compression release the GIL for much of their time
+        charts_future = _chart_pool.submit(self._generate_charts, df, profile)
         
-        # Build HTML
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Survey Analysis Report</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 40px; }}
-                h1 {{ color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }}
-                h2 {{ color: #34495e; margin-top: 30px; }}
-                table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
-                th, td {{ border: 1px solid #ddd; padding: 12px; text-align: left; }}
-                th {{ background-color: #3498db; color: white; }}
-                tr:nth-child(even) {{ background-color: #f2f2f2; }}
-                .summary-box {{ background: #ecf0f1; padding: 20px; border-radius: 5px; margin: 20px 0; }}
-                .chart {{ margin: 20px 0; text-align: center; }}
-                .metadata {{ color: #7f8c8d; font-size: 0.9em; }}
-            </style>
-        </head>
-        <body>
-            <h1>Survey Data Analysis Report</h1>
-            
-            <div class="metadata">
-                <p><strong>Document ID:</strong> {document_id}</p>
-                <p><strong>Workflow ID:</strong> {workflow_id}</p>
-                <p><strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-            </div>
-            
-            <div class="summary-box">
-                <h2>Executive Summary</h2>
-                <ul>
-                    <li><strong>Total Records:</strong> {len(df):,}</li>
-                    <li><strong>Total Variables:</strong> {len(df.columns)}</li>
-                    <li><strong>Numeric Variables:</strong> {len(df.select_dtypes(include=[np.number]).columns)}</li>
-                    <li><strong>Categorical Variables:</strong> {len(df.select_dtypes(include=['object']).columns)}</li>
-                </ul>
-            </div>
-            
-            <h2>Data Quality Summary</h2>
-            <table>
-                <tr>
-                    <th>Variable</th>
-                    <th>Type</th>
-                    <th>Missing Count</th>
-                    <th>Missing %</th>
-                    <th>Unique Values</th>
-                </tr>
-        """
-        
-        # Add data quality rows
-        for col in df.columns[:20]:  # First 20 columns
-            missing_count = df[col].isnull().sum()
-            missing_pct = (missing_count / len(df)) * 100
-            unique_count = df[col].nunique()
-            dtype = str(df[col].dtype)
-            
-            html += f"""
-                <tr>
-                    <td>{col}</td>
-                    <td>{dtype}</td>
-                    <td>{missing_count}</td>
-                    <td>{missing_pct:.1f}%</td>
-                    <td>{unique_count}</td>
-                </tr>
-            """
-        
-        html += """
-            </table>
-            
-            <h2>Descriptive Statistics</h2>
-            <table>
-                <tr>
-                    <th>Variable</th>
-                    <th>Mean</th>
-                    <th>Std Dev</th>
-                    <th>Min</th>
-                    <th>25%</th>
-                    <th>50%</th>
-                    <th>75%</th>
-                    <th>Max</th>
-                </tr>
-        """
-        
-        # Add statistics for numeric columns
-        numeric_cols = df.select_dtypes(include=[np.number]).columns[:15]
-        for col in numeric_cols:
-            desc = df[col].describe()
-            html += f"""
-                <tr>
-                    <td>{col}</td>
-                    <td>{desc['mean']:.2f}</td>
-                    <td>{desc['std']:.2f}</td>
-                    <td>{desc['min']:.2f}</td>
-                    <td>{desc['25%']:.2f}</td>
-                    <td>{desc['50%']:.2f}</td>
-                    <td>{desc['75%']:.2f}</td>
-                    <td>{desc['max']:.2f}</td>
-                </tr>
-            """
-        
-        html += """
-            </table>
-            
-            <h2>Key Findings</h2>
-            <div class="summary-box">
-                <ul>
-        """
+        # Calculate basic statistics
+        stats = self._calculate_basic_stats(df, profile)
         
-        # Add key findings
-        findings = self._generate_key_findings(df)
-        for finding in findings:
-            html += f"<li>{finding}</li>"
+        # Data quality rows for the first 20 columns
+        sub = df.iloc[:, :20]
+        quality = pd.DataFrame({
+            'dtype': sub.dtypes.astype(str),
+            'missing': profile["null_counts"].iloc[:20],
+            'nunique': sub.nunique()
+        })
+        quality['missing_pct'] = quality['missing'] / len(df) * 100
         
-        html += """
-                </ul>
-            </div>
-            
-            <h2>Visualizations</h2>
-        """
+        # Statistics for the first 15 numeric columns, described together
+        numeric_cols = profile["numeric_cols"][:15]
+        desc_rows = []
+        if len(numeric_cols) > 0:
+            desc_rows = list(df[numeric_cols].describe().T.itertuples(name=None))
         
-        # Add charts
-        for chart in charts:
-            html += f"""
-            <div class="chart">
-                <h3>{chart['title']}</h3>
-                <img src="data:image/png;base64,{chart['data']}" style="max-width: 800px;">
-            </div>
-            """
+        return _HTML_TEMPLATE.render(
+            document_id=document_id,
+            workflow_id=workflow_id,
+            generated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            stats=stats,
+            quality_rows=quality.itertuples(name=None),
+            desc_rows=desc_rows,
+            findings=self._generate_key_findings(df, profile),
+            charts=charts_future.result()
+        )
+    
+    def generate_html_report_to(self, df: pd.DataFrame, document_id: str, workflow_id: str,
+                                out_path: str, compress: bool = False) -> str:
+        """Generate the HTML report and write it to out_path (gzipped to out_path + '.gz' if compress); returns the path written"""
+        data = self.generate_html_report(df, document_id, workflow_id).encode('utf-8')
         
-        html += """
-            <h2>Appendix</h2>
-            <p>This report was automatically generated using the AI-Enhanced Data Preparation System (AIDEPS).</p>
-            <p>For detailed analysis and raw data, please refer to the source files in the instance folder.</p>
-        </body>
-        </html>
-        """
+        if compress:
+            out_path += '.gz'
+            # Level 1 is cheap and still shrinks the markup and base64 charts several-fold
+            with gzip.open(out_path, 'wb', compresslevel=1) as f:
+                f.write(data)
+        else:
+            with open(out_path, 'wb') as f:
+                f.write(data)
         
-        return html
+        return out_path
     
     def generate_excel_report(self, df: pd.DataFrame, output_path: str):
         """Generate Excel report with multiple sheets"""
         
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        # constant_memory flushes each row to disk once the next row starts, so
+        # every sheet is written strictly row by row (pandas' to_excel writes by column)
+        workbook_options = {
+            'constant_memory': True,
+            'remove_timezone': True,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+        }
+        profile = self._profile(df)
+        with xlsxwriter.Workbook(output_path, workbook_options) as workbook:
+            header_format = workbook.add_format({'bold': True})
+            
             # Sheet 1: Summary Statistics
             summary_stats = df.describe()
-            summary_stats.to_excel(writer, sheet_name='Summary Statistics')
+            self._write_excel_sheet(workbook, 'Summary Statistics', summary_stats,
+                                    header_format, index=True)
             
             # Sheet 2: Data Quality
+            null_counts = profile["null_counts"]
             quality_df = pd.DataFrame({
                 'Column': df.columns,
-                'Type': [str(df[col].dtype) for col in df.columns],
-                'Missing Count': [df[col].isnull().sum() for col in df.columns],
-                'Missing %': [(df[col].isnull().sum() / len(df)) * 100 for col in df.columns],
-                'Unique Values': [df[col].nunique() for col in df.columns]
+                'Type': df.dtypes.astype(str).to_numpy(),
+                'Missing Count': null_counts.to_numpy(),
+                'Missing %': (null_counts / len(df) * 100).to_numpy(),
+                'Unique Values': df.nunique().to_numpy()
             })
-            quality_df.to_excel(writer, sheet_name='Data Quality', index=False)
+            self._write_excel_sheet(workbook, 'Data Quality', quality_df, header_format)
             
             # Sheet 3: Sample Data
-            df.head(100).to_excel(writer, sheet_name='Sample Data', index=False)
+            self._write_excel_sheet(workbook, 'Sample Data', df.head(100), header_format)
             
             # Sheet 4: Correlations (if applicable)
-            numeric_df = df.select_dtypes(include=[np.number])
-            if len(numeric_df.columns) > 1:
-                corr_matrix = numeric_df.corr()
-                corr_matrix.to_excel(writer, sheet_name='Correlations')
+            numeric_cols = profile["numeric_cols"]
+            if len(numeric_cols) > 1:
+                values = df[numeric_cols].to_numpy(dtype=np.float64)
+                if np.isnan(values).any():
+                    # Pairwise-complete correlations when values are missing
+                    corr_matrix = df[numeric_cols].corr()
+                else:
+                    # Complete data: one matrix product instead of pandas' pairwise loop
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        corr = np.corrcoef(values, rowvar=False)
+                    corr_matrix = pd.DataFrame(corr, index=numeric_cols, columns=numeric_cols)
+                self._write_excel_sheet(workbook, 'Correlations', corr_matrix,
+                                        header_format, index=True)
+    
+    def _write_excel_sheet(self, workbook, sheet_name: str, frame: pd.DataFrame,
+                           header_format, index: bool = False):
+        """Write a DataFrame to a new worksheet one row at a time"""
+        worksheet = workbook.add_worksheet(sheet_name)
+        
+        header = ([""] if index else []) + [str(col) for col in frame.columns]
+        worksheet.write_row(0, 0, header, header_format)
+        
+        # Python scalars with None for missing cells, which xlsxwriter leaves blank
+        cells = frame.astype(object).where(frame.notna(), None)
+        for row_num, (label, row) in enumerate(
+                zip(cells.index, cells.itertuples(index=False, name=None)), start=1):
+            worksheet.write_row(row_num, 0, ((label,) if index else ()) + row)
     
-    def generate_summary_json(self, df: pd.DataFrame) -> str:
-        """Generate JSON summary of the analysis"""
+    def generate_summary_json(self, df: pd.DataFrame) -> bytes:
+        """Generate JSON summary of the analysis, encoded as UTF-8"""
         
+        profile = self._profile(df)
+        null_counts = profile["null_counts"]
+        null_pct = (null_counts / len(df) * 100).round(2)
         summary = {
             "metadata": {
                 "generated_at": datetime.now().isoformat(),
@@ -254,118 +320,138 @@ class ReportGenerator:
                 "total_columns": len(df.columns)
             },
             "data_types": {
-                "numeric": df.select_dtypes(include=[np.number]).columns.tolist(),
-                "categorical": df.select_dtypes(include=['object']).columns.tolist()
+                "numeric": profile["numeric_cols"].tolist(),
+                "categorical": profile["cat_cols"].tolist()
             },
             "missing_data": {
                 col: {
-                    "count": int(df[col].isnull().sum()),
-                    "percentage": round((df[col].isnull().sum() / len(df)) * 100, 2)
+                    "count": int(count),
+                    "percentage": pct
                 }
-                for col in df.columns
+                for col, count, pct in zip(df.columns, null_counts.to_numpy(), null_pct.to_numpy())
             },
             "basic_statistics": {}
         }
         
-        # Add basic statistics for numeric columns
-        for col in df.select_dtypes(include=[np.number]).columns:
-            summary["basic_statistics"][col] = {
-                "mean": round(df[col].mean(), 2),
-                "std": round(df[col].std(), 2),
-                "min": round(df[col].min(), 2),
-                "max": round(df[col].max(), 2)
-            }
+        # Add basic statistics for numeric columns, aggregated together
+        numeric_cols = profile["numeric_cols"]
+        if len(numeric_cols) > 0:
+            summary["basic_statistics"] = (
+                df[numeric_cols].agg(['mean', 'std', 'min', 'max']).round(2).to_dict()
+            )
         
-        return json.dumps(summary, indent=2)
+        return orjson.dumps(
+            summary,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    
+    def _profile(self, df: pd.DataFrame) -> Dict:
+        """Missing counts and column groups shared by the report sections, computed once per report"""
+        null_counts = df.isnull().sum()
+        return {
+            "null_counts": null_counts,
+            "total_missing": null_counts.sum(),
+            "numeric_cols": df.select_dtypes(include=[np.number]).columns,
+            "cat_cols": df.select_dtypes(include=['object']).columns
+        }
     
-    def _calculate_basic_stats(self, df: pd.DataFrame) -> Dict:
+    def _calculate_basic_stats(self, df: pd.DataFrame, profile: Optional[Dict] = None) -> Dict:
         """Calculate basic statistics for the report"""
+        profile = profile or self._profile(df)
         return {
             "total_records": len(df),
             "total_columns": len(df.columns),
-            "numeric_columns": len(df.select_dtypes(include=[np.number]).columns),
-            "categorical_columns": len(df.select_dtypes(include=['object']).columns),
-            "missing_percentage": (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
+            "numeric_columns": len(profile["numeric_cols"]),
+            "categorical_columns": len(profile["cat_cols"]),
+            "missing_percentage": (profile["total_missing"] / (len(df) * len(df.columns))) * 100
         }
     
-    def _generate_charts(self, df: pd.DataFrame) -> List[Dict]:
+    def _generate_charts(self, df: pd.DataFrame, profile: Optional[Dict] = None) -> List[Dict]:
         """Generate charts for the report"""
+        profile = profile or self._profile(df)
         charts = []
         
-        # Only generate charts for small datasets to avoid memory issues
-        if len(df) > 10000:
-            df_sample = df.sample(n=10000)
+        # Only chart a sample of large datasets to avoid memory issues; a fixed seed keeps reports reproducible
+        if len(df) > CHART_SAMPLE_SIZE:
+            rng = np.random.default_rng(0)
+            rows = np.sort(rng.choice(len(df), size=CHART_SAMPLE_SIZE, replace=False))
+            df_sample = df.take(rows)
+            missing_counts = df_sample.isnull().sum()
         else:
             df_sample = df
+            missing_counts = profile["null_counts"]
+        numeric_cols = profile["numeric_cols"]
+        
+        # A standalone figure, cleared between charts, keeps clear of pyplot's global state
+        fig = Figure(figsize=(10, 6))
         
         # Chart 1: Missing data heatmap
         try:
-            plt.figure(figsize=(10, 6))
-            missing_data = df_sample.isnull().sum()
-            missing_data = missing_data[missing_data > 0][:20]  # Top 20 columns with missing data
+            missing_data = missing_counts[missing_counts > 0][:20]  # Top 20 columns with missing data
             
             if len(missing_data) > 0:
-                missing_data.plot(kind='bar')
-                plt.title('Missing Data by Column')
-                plt.xlabel('Column')
-                plt.ylabel('Missing Count')
-                plt.xticks(rotation=45, ha='right')
-                plt.tight_layout()
-                
-                buffer = io.BytesIO()
-                plt.savefig(buffer, format='png')
-                buffer.seek(0)
-                chart_data = base64.b64encode(buffer.read()).decode()
-                plt.close()
+                fig.clf()
+                ax = fig.subplots()
+                positions = np.arange(len(missing_data))
+                ax.bar(positions, missing_data.to_numpy())
+                ax.set_xticks(positions, missing_data.index.astype(str), rotation=45, ha='right')
+                ax.set_title('Missing Data by Column')
+                ax.set_xlabel('Column')
+                ax.set_ylabel('Missing Count')
+                fig.tight_layout()
                 
                 charts.append({
                     "title": "Missing Data Analysis",
-                    "data": chart_data
+                    "data": self._figure_png(fig)
                 })
         except Exception as e:
             print(f"Error generating missing data chart: {e}")
         
         # Chart 2: Distribution of a numeric variable
         try:
-            numeric_cols = df_sample.select_dtypes(include=[np.number]).columns
             if len(numeric_cols) > 0:
-                plt.figure(figsize=(10, 6))
-                df_sample[numeric_cols[0]].hist(bins=30)
-                plt.title(f'Distribution of {numeric_cols[0]}')
-                plt.xlabel(numeric_cols[0])
-                plt.ylabel('Frequency')
-                plt.tight_layout()
-                
-                buffer = io.BytesIO()
-                plt.savefig(buffer, format='png')
-                buffer.seek(0)
-                chart_data = base64.b64encode(buffer.read()).decode()
-                plt.close()
+                fig.clf()
+                ax = fig.subplots()
+                ax.hist(df_sample[numeric_cols[0]].dropna().to_numpy(), bins=30)
+                ax.grid(True)
+                ax.set_title(f'Distribution of {numeric_cols[0]}')
+                ax.set_xlabel(numeric_cols[0])
+                ax.set_ylabel('Frequency')
+                fig.tight_layout()
                 
                 charts.append({
                     "title": f"Distribution of {numeric_cols[0]}",
-                    "data": chart_data
+                    "data": self._figure_png(fig)
                 })
         except Exception as e:
             print(f"Error generating distribution chart: {e}")
         
         return charts
     
-    def _generate_key_findings(self, df: pd.DataFrame) -> List[str]:
+    @staticmethod
+    def _figure_png(fig: Figure) -> str:
+        """Render a figure as a base64-encoded PNG"""
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=CHART_DPI)
+        # Encode straight from the buffer's memory rather than a copy of its bytes
+        return binascii.b2a_base64(buffer.getbuffer(), newline=False).decode('ascii')
+    
+    def _generate_key_findings(self, df: pd.DataFrame, profile: Optional[Dict] = None) -> List[str]:
         """Generate key findings from the data"""
+        profile = profile or self._profile(df)
         findings = []
         
         # Finding 1: Data completeness
-        missing_pct = (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
+        missing_pct = (profile["total_missing"] / (len(df) * len(df.columns))) * 100
         findings.append(f"Overall data completeness: {100 - missing_pct:.1f}%")
         
         # Finding 2: Most complete variables
-        complete_cols = df.columns[df.isnull().sum() == 0].tolist()[:5]
+        complete_cols = df.columns[profile["null_counts"].to_numpy() == 0].tolist()[:5]
         if complete_cols:
             findings.append(f"Completely filled variables: {', '.join(complete_cols)}")
         
         # Finding 3: Numeric variable ranges
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        numeric_cols = profile["numeric_cols"]
         if len(numeric_cols) > 0:
             col = numeric_cols[0]
             findings.append(
@@ -374,10 +460,12 @@ class ReportGenerator:
             )
         
         # Finding 4: Categorical distribution
-        cat_cols = df.select_dtypes(include=['object']).columns
+        cat_cols = profile["cat_cols"]
         if len(cat_cols) > 0:
             col = cat_cols[0]
-            mode_value = df[col].mode()[0] if not df[col].mode().empty else "N/A"
+            # Hash counts give the most common value without sorting every distinct one
+            counts = df[col].value_counts(dropna=True)
+            mode_value = counts.index[0] if len(counts) else "N/A"
             findings.append(f"Most common value in {col}: {mode_value}")
         
         return findings
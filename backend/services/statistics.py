@@ -6,6 +6,39 @@ from typing import Dict, List, Optional, Tuple
 class StatisticsService:
     """Service for statistical calculations and weighting (Stage 4)"""
     
+    @staticmethod
+    def _get_column(df: pd.DataFrame, column: str) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """Contiguous float64 values of a column (None if not numeric) and its missing-value mask"""
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            values = np.ascontiguousarray(series.to_numpy(dtype=np.float64, na_value=np.nan))
+            return values, np.isnan(values)
+        return None, series.isna().to_numpy()
+    
+    def _get_arrays(self, df: pd.DataFrame, variable: str, weight_column: str = None,
+                    weight_arrays: Optional[tuple] = None) -> Tuple[Optional[np.ndarray], np.ndarray, np.ndarray]:
+        """Float64 values (None if not numeric) and weights of the rows where both are present, plus that row mask.
+        
+        Arrays are extracted afresh on every call, so results always reflect the frame's current
+        contents; callers handling several variables pass the weight column's _get_column result
+        as weight_arrays to convert it only once.
+        """
+        values, missing = self._get_column(df, variable)
+        valid = ~missing
+        if weight_column and weight_column in df.columns:
+            weights, weights_missing = weight_arrays or self._get_column(df, weight_column)
+            if weights is None:
+                weights = df[weight_column].to_numpy(dtype=np.float64, na_value=np.nan)
+                weights_missing = np.isnan(weights)
+            valid &= ~weights_missing
+            weights = weights[valid]
+        else:
+            weights = np.ones(int(valid.sum()))
+        
+        if values is not None:
+            values = values[valid]
+        return values, weights, valid
+    
     def apply_weights(self, df: pd.DataFrame, weight_column: str) -> pd.DataFrame:
         """Apply survey weights to the dataset"""
         if weight_column not in df.columns:
@@ -26,29 +59,33 @@ class StatisticsService:
         if variable not in df.columns:
             raise ValueError(f"Variable '{variable}' not found in dataset")
         
-        # Remove missing values
-        data = df[[variable]].copy()
-        if weight_column and weight_column in df.columns:
-            data[weight_column] = df[weight_column]
-            data = data.dropna()
-            weights = data[weight_column].values
-        else:
-            data = data.dropna()
-            weights = np.ones(len(data))
+        # Complete cases only
+        values, weights, _ = self._get_arrays(df, variable, weight_column)
+        if values is None:
+            raise ValueError(f"Variable '{variable}' is not numeric")
         
-        values = data[variable].values
+        weight_sum = weights.sum()
+        if weight_sum == 0:
+            raise ValueError(f"No weighted observations for '{variable}'")
         
         # Calculate weighted mean
-        weighted_mean = np.average(values, weights=weights)
+        weighted_mean = np.dot(weights, values) / weight_sum
         
-        # Calculate weighted variance
-        variance = np.average((values - weighted_mean) ** 2, weights=weights)
+        # Calculate weighted variance; deviations from the mean rather than
+        # E[X^2] - E[X]^2, which loses precision when the mean dwarfs the spread
+        deviations = values - weighted_mean
+        variance = np.dot(weights * deviations, deviations) / weight_sum
         
         # Calculate standard error
-        n_eff = weights.sum() ** 2 / (weights ** 2).sum()  # Effective sample size
+        n_eff = weight_sum ** 2 / np.dot(weights, weights)  # Effective sample size
         standard_error = np.sqrt(variance / n_eff)
         
-        # Calculate 95% confidence interval
+        return self._mean_result(variable, weighted_mean, standard_error, len(values), n_eff)
+    
+    @staticmethod
+    def _mean_result(variable: str, weighted_mean: float, standard_error: float,
+                     sample_size: int, n_eff: float) -> Dict:
+        """Weighted mean summary with a 95% confidence interval"""
         ci_lower = weighted_mean - 1.96 * standard_error
         ci_upper = weighted_mean + 1.96 * standard_error
         
@@ -61,7 +98,7 @@ class StatisticsService:
                 "upper": round(float(ci_upper), 4),
                 "level": 0.95
             },
-            "sample_size": len(values),
+            "sample_size": int(sample_size),
             "effective_sample_size": round(float(n_eff), 2)
         }
     
@@ -71,25 +108,23 @@ class StatisticsService:
         if variable not in df.columns:
             raise ValueError(f"Variable '{variable}' not found in dataset")
         
-        # Create binary indicator
-        data = df[[variable]].copy()
-        if weight_column and weight_column in df.columns:
-            data[weight_column] = df[weight_column]
-            data = data.dropna()
-            weights = data[weight_column].values
-        else:
-            data = data.dropna()
-            weights = np.ones(len(data))
+        # Complete cases only
+        _, weights, valid = self._get_arrays(df, variable, weight_column)
+        
+        weight_sum = weights.sum()
+        if weight_sum == 0:
+            raise ValueError(f"No weighted observations for '{variable}'")
         
         # Binary indicator for the category
-        indicator = (data[variable] == category).astype(int).values
+        indicator = (df[variable] == category).to_numpy()[valid]
         
         # Calculate weighted proportion
-        weighted_prop = np.average(indicator, weights=weights)
+        weighted_count = np.dot(indicator, weights)
+        weighted_prop = weighted_count / weight_sum
         
         # Calculate standard error (using formula for proportion)
         variance = weighted_prop * (1 - weighted_prop)
-        n_eff = weights.sum() ** 2 / (weights ** 2).sum()
+        n_eff = weight_sum ** 2 / np.dot(weights, weights)
         standard_error = np.sqrt(variance / n_eff)
         
         # Calculate 95% confidence interval
@@ -111,8 +146,8 @@ class StatisticsService:
                 "upper": round(float(ci_upper), 4),
                 "level": 0.95
             },
-            "count": int(indicator.sum()),
-            "weighted_count": round(float((indicator * weights).sum()), 2),
+            "count": int(np.count_nonzero(indicator)),
+            "weighted_count": round(float(weighted_count), 2),
             "sample_size": len(indicator)
         }
     
@@ -123,29 +158,21 @@ class StatisticsService:
             raise ValueError("Variables not found in dataset")
         
         if weight_column and weight_column in df.columns:
-            # Weighted crosstab
-            crosstab = pd.crosstab(
-                df[row_var], 
-                df[col_var], 
-                weights=df[weight_column], 
-                normalize='all'
+            # Weighted crosstab; the chi-square cell counts reuse the same grouping
+            cells = df.groupby([row_var, col_var], observed=True)[weight_column]
+            table = self._unstack_cells(cells.sum())
+            counts, (chi2, p_value, dof, expected) = self._contingency(
+                df, row_var, col_var, self._unstack_cells(cells.size())
             )
         else:
             # Unweighted crosstab
-            crosstab = pd.crosstab(
-                df[row_var], 
-                df[col_var], 
-                normalize='all'
-            )
+            counts, (chi2, p_value, dof, expected) = self._contingency(df, row_var, col_var)
+            table = counts
+        crosstab = table / table.to_numpy().sum()
         
         # Convert to percentages
         crosstab_pct = crosstab * 100
         
-        # Calculate chi-square test
-        chi2, p_value, dof, expected = stats.chi2_contingency(
-            pd.crosstab(df[row_var], df[col_var])
-        )
-        
         return {
             "row_variable": row_var,
             "column_variable": col_var,
@@ -159,6 +186,23 @@ class StatisticsService:
             }
         }
     
+    @staticmethod
+    def _unstack_cells(cells: pd.Series) -> pd.DataFrame:
+        """Row x column table from per-cell groupby results, with sorted columns like pd.crosstab"""
+        table = cells.unstack(fill_value=0)
+        # unstack can keep first-seen column order once rows with missing values were skipped
+        if not table.columns.is_monotonic_increasing:
+            table = table.sort_index(axis=1)
+        return table
+    
+    def _contingency(self, df: pd.DataFrame, row_var: str, col_var: str,
+                     counts: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, tuple]:
+        """Cell counts of the complete cases and their chi-square test; counts already grouped by the caller are reused"""
+        if counts is None:
+            # One grouped pass; rows missing either variable are dropped by the groupby
+            counts = self._unstack_cells(df.groupby([row_var, col_var], observed=True).size())
+        return counts, tuple(stats.chi2_contingency(counts.to_numpy()))
+    
     def calculate_population_estimates(self, df: pd.DataFrame, variables: List[str],
                                       weight_column: str, population_size: int = None) -> Dict:
         """Calculate population-level estimates from survey data"""
@@ -173,27 +217,31 @@ class StatisticsService:
         else:
             scaling_factor = 1
         
+        # The weight column is converted once and shared by every continuous variable
+        weight_arrays = self._get_column(df, weight_column)
+        
         for var in variables:
             if var not in df.columns:
                 continue
             
             if df[var].dtype in ['int64', 'float64']:
                 # Continuous variable - calculate total
-                data = df[[var, weight_column]].dropna()
-                weighted_total = (data[var] * data[weight_column] * scaling_factor).sum()
+                values, weights, _ = self._get_arrays(df, var, weight_column, weight_arrays)
+                weighted_total = np.dot(values, weights) * scaling_factor
                 
                 estimates[var] = {
                     "type": "continuous",
                     "weighted_total": round(float(weighted_total), 2),
-                    "weighted_mean": round(float(weighted_total / (data[weight_column] * scaling_factor).sum()), 2)
+                    "weighted_mean": round(float(weighted_total / (weights.sum() * scaling_factor)), 2)
                 }
             else:
-                # Categorical variable - calculate counts
-                categories = {}
-                for category in df[var].unique():
-                    if pd.notna(category):
-                        count = ((df[var] == category) * df[weight_column] * scaling_factor).sum()
-                        categories[str(category)] = round(float(count), 2)
+                # Categorical variable - weighted counts per category in one grouped sum,
+                # categories in order of first appearance
+                weight_sums = df.groupby(var, sort=False, observed=True)[weight_column].sum()
+                categories = {
+                    str(category): round(float(total * scaling_factor), 2)
+                    for category, total in weight_sums.items()
+                }
                 
                 estimates[var] = {
                     "type": "categorical",
@@ -214,34 +262,82 @@ class StatisticsService:
             raise ValueError("Variables not found in dataset")
         
         subgroup_stats = {}
-        
-        for group in df[group_var].unique():
-            if pd.notna(group):
-                subset = df[df[group_var] == group]
-                
-                if df[target_var].dtype in ['int64', 'float64']:
-                    # Calculate weighted mean for continuous variable
-                    stats_result = self.calculate_weighted_mean(
-                        subset, target_var, weight_column
-                    )
-                    subgroup_stats[str(group)] = stats_result
-                else:
-                    # Calculate distribution for categorical variable
-                    value_counts = subset[target_var].value_counts()
-                    if weight_column and weight_column in subset.columns:
-                        weighted_counts = {}
-                        for val in value_counts.index:
-                            prop = self.calculate_weighted_proportion(
-                                subset, target_var, val, weight_column
-                            )
-                            weighted_counts[str(val)] = prop["percentage"]
-                    else:
-                        weighted_counts = (value_counts / len(subset) * 100).to_dict()
-                    
-                    subgroup_stats[str(group)] = {
-                        "distribution": weighted_counts,
-                        "sample_size": len(subset)
+        # Group codes in order of first appearance; missing groups are coded -1
+        codes, groups = pd.factorize(df[group_var])
+        n_groups = len(groups)
+        
+        if df[target_var].dtype in ['int64', 'float64']:
+            # Weighted mean per group from per-group sums over the complete cases
+            values, weights, valid = self._get_arrays(df, target_var, weight_column)
+            group_codes = codes[valid]
+            in_group = group_codes >= 0
+            group_codes, values, weights = group_codes[in_group], values[in_group], weights[in_group]
+            
+            counts = np.bincount(group_codes, minlength=n_groups)
+            weight_sums = np.bincount(group_codes, weights=weights, minlength=n_groups)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                means = np.bincount(group_codes, weights=weights * values, minlength=n_groups) / weight_sums
+                variances = np.bincount(
+                    group_codes, weights=weights * (values - means[group_codes]) ** 2, minlength=n_groups
+                ) / weight_sums
+                n_eff = weight_sums ** 2 / np.bincount(group_codes, weights=weights ** 2, minlength=n_groups)
+                standard_errors = np.sqrt(variances / n_eff)
+            
+            for code, group in enumerate(groups):
+                # Groups without complete, positively weighted cases have no mean
+                if weight_sums[code] == 0:
+                    continue
+                subgroup_stats[str(group)] = self._mean_result(
+                    target_var, means[code], standard_errors[code], counts[code], n_eff[code]
+                )
+        else:
+            # Distribution per group from counts (and weight sums) over (group, value)
+            # codes, laid out as a groups x values matrix
+            value_codes, values = pd.factorize(df[target_var])
+            n_values = len(values)
+            in_group = codes >= 0
+            group_sizes = np.bincount(codes[in_group], minlength=n_groups)
+            
+            paired = in_group & (value_codes >= 0)
+            pair_codes = codes[paired] * n_values + value_codes[paired]
+            counts = np.bincount(pair_codes, minlength=n_groups * n_values).reshape(n_groups, n_values)
+            # First row of each pair, so values within a group keep value_counts' order on ties
+            first_seen = np.full(n_groups * n_values, len(pair_codes))
+            np.minimum.at(first_seen, pair_codes, np.arange(len(pair_codes)))
+            first_seen = first_seen.reshape(n_groups, n_values)
+            
+            weighted = bool(weight_column) and weight_column in df.columns
+            if weighted:
+                weights = df[weight_column].to_numpy(dtype=np.float64, na_value=np.nan)[paired]
+                has_weight = ~np.isnan(weights)
+                weight_sums = np.bincount(
+                    pair_codes[has_weight], weights=weights[has_weight], minlength=n_groups * n_values
+                ).reshape(n_groups, n_values)
+                weight_totals = weight_sums.sum(axis=1)
+            
+            for code, group in enumerate(groups):
+                seen = np.flatnonzero(counts[code])
+                seen = seen[np.argsort(first_seen[code, seen], kind='stable')]
+                # Value codes ordered by count, as value_counts would
+                order = pd.Series(counts[code, seen], index=seen).sort_values(ascending=False).index.to_numpy()
+                if weighted:
+                    total = weight_totals[code]
+                    # Values seen, but none of them weighted
+                    if len(order) and total == 0:
+                        continue
+                    weighted_counts = {
+                        str(val): round(float(share / total * 100), 2)
+                        for val, share in zip(values[order], weight_sums[code, order])
                     }
+                else:
+                    weighted_counts = pd.Series(
+                        counts[code, order] / group_sizes[code] * 100, index=values[order]
+                    ).to_dict()
+                
+                subgroup_stats[str(group)] = {
+                    "distribution": weighted_counts,
+                    "sample_size": int(group_sizes[code])
+                }
         
         return {
             "target_variable": target_var,
@@ -255,8 +351,9 @@ class StatisticsService:
         if var1 not in df.columns or var2 not in df.columns:
             raise ValueError("Variables not found in dataset")
         
-        # Remove missing values
-        data = df[[var1, var2]].dropna()
+        # Complete cases as a row mask over the columns, rather than a dropna'd copy of both
+        valid = (df[var1].notna() & df[var2].notna()).to_numpy()
+        sample_size = int(np.count_nonzero(valid))
         
         # Determine test type if auto
         if test_type == "auto":
@@ -273,11 +370,14 @@ class StatisticsService:
             "variable1": var1,
             "variable2": var2,
             "test_type": test_type,
-            "sample_size": len(data)
+            "sample_size": sample_size
         }
         
         if test_type == "correlation":
-            corr, p_value = stats.pearsonr(data[var1], data[var2])
+            corr, p_value = stats.pearsonr(
+                df[var1].to_numpy(dtype=np.float64, na_value=np.nan)[valid],
+                df[var2].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+            )
             result.update({
                 "correlation": round(float(corr), 4),
                 "p_value": round(float(p_value), 4),
@@ -285,10 +385,11 @@ class StatisticsService:
             })
         
         elif test_type == "t_test":
-            groups = data[var2].unique()
+            codes, groups = pd.factorize(df[var2].to_numpy()[valid])
             if len(groups) == 2:
-                group1 = data[data[var2] == groups[0]][var1]
-                group2 = data[data[var2] == groups[1]][var1]
+                values = df[var1].to_numpy()[valid]
+                group1 = values[codes == 0]
+                group2 = values[codes == 1]
                 t_stat, p_value = stats.ttest_ind(group1, group2)
                 result.update({
                     "t_statistic": round(float(t_stat), 4),
@@ -299,7 +400,12 @@ class StatisticsService:
                 })
         
         elif test_type == "anova":
-            groups = [data[data[var2] == g][var1].values for g in data[var2].unique()]
+            # Sort the values by group once and split at the group boundaries,
+            # instead of a boolean scan per group
+            codes, uniques = pd.factorize(df[var2].to_numpy()[valid])
+            values = df[var1].to_numpy()[valid][np.argsort(codes, kind='stable')]
+            sizes = np.bincount(codes, minlength=len(uniques))
+            groups = np.split(values, np.cumsum(sizes)[:-1]) if len(uniques) else []
             f_stat, p_value = stats.f_oneway(*groups)
             result.update({
                 "f_statistic": round(float(f_stat), 4),
@@ -308,8 +414,7 @@ class StatisticsService:
             })
         
         elif test_type == "chi_square":
-            crosstab = pd.crosstab(data[var1], data[var2])
-            chi2, p_value, dof, expected = stats.chi2_contingency(crosstab)
+            _, (chi2, p_value, dof, expected) = self._contingency(df, var1, var2)
             result.update({
                 "chi2_statistic": round(float(chi2), 4),
                 "p_value": round(float(p_value), 4),
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for Stage 3 pattern discovery on complete, correlated numeric columns
+and on large integer-valued columns, whose key statistics must stay exact
+"""
+
+import requests
+import sys
+import numpy as np
+import pandas as pd
+
+BASE_URL = "http://localhost:8000"
+
+def make_sample_csv(rows: int = 500) -> bytes:
+    """CSV without missing values where a and b are strongly correlated"""
+    return make_sample_frame(rows).to_csv(index=False).encode("utf-8")
+
+def make_sample_frame(rows: int = 500) -> pd.DataFrame:
+    """Correlated a/b, noise c, and integers beyond float32's exact range"""
+    rng = np.random.default_rng(0)
+    a = rng.normal(50, 10, rows)
+    big = 16777217 + rng.integers(0, 123456789 - 16777217, rows)
+    big[:2] = [16777217, 123456789]
+    return pd.DataFrame({
+        "a": a,
+        "b": a * 2 + rng.normal(0, 1, rows),
+        "c": rng.normal(0, 1, rows),
+        "big": big,
+        # Same integers stored as floats, as columns with missing values are
+        "big_float": big.astype(float)
+    })
+
+def upload_document():
+    """Upload the generated CSV and return IDs"""
+    print("Uploading document...")
+    files = {'file': ('correlated.csv', make_sample_csv(), 'text/csv')}
+    data = {'document_name': 'Correlated columns'}
+
+    response = requests.post(f"{BASE_URL}/api/documents/upload", files=files, data=data)
+    if response.status_code == 200:
+        result = response.json()
+        print(f"✓ Upload successful: {result['document_id']}")
+        return result['document_id'], result['workflow_id']
+    else:
+        print(f"✗ Upload failed: {response.text}")
+        return None, None
+
+def test_discover_high_correlations(workflow_id, document_id):
+    """Discover patterns and check the a/b pair is reported as a high correlation"""
+    print("\n=== Testing Stage 3: High correlations ===")
+    response = requests.post(
+        f"{BASE_URL}/api/stages/analysis/discover",
+        params={"workflow_id": workflow_id, "document_id": document_id}
+    )
+
+    if response.status_code != 200:
+        print(f"✗ Pattern discovery failed: {response.status_code}")
+        print(f"  Error: {response.text}")
+        return False
+
+    high = response.json()["correlations"].get("high_correlations", [])
+    pairs = {(item["var1"], item["var2"]): item["correlation"] for item in high}
+    if ("a", "b") not in pairs or not isinstance(pairs[("a", "b")], float):
+        print(f"✗ Expected a float correlation for (a, b), got: {high}")
+        return False
+
+    print(f"✓ High correlations: {high}")
+    return True
+
+def test_discover_large_integer_statistics(workflow_id, document_id):
+    """Check min, max and quartiles of large integer-valued columns are reported exactly"""
+    print("\n=== Testing Stage 3: Large integer statistics ===")
+    response = requests.post(
+        f"{BASE_URL}/api/stages/analysis/discover",
+        params={"workflow_id": workflow_id, "document_id": document_id}
+    )
+
+    if response.status_code != 200:
+        print(f"✗ Pattern discovery failed: {response.status_code}")
+        print(f"  Error: {response.text}")
+        return False
+
+    frame = make_sample_frame()
+    for col in ("big", "big_float"):
+        described = frame[col].describe().round(2)
+        expected = {
+            "min": described["min"],
+            "q1": described["25%"],
+            "median": described["50%"],
+            "q3": described["75%"],
+            "max": described["max"]
+        }
+        stats = response.json()["key_statistics"].get(col, {})
+        mismatched = {key: (stats.get(key), value) for key, value in expected.items() if stats.get(key) != value}
+        if mismatched:
+            print(f"✗ Key statistics of {col} differ (got, expected): {mismatched}")
+            return False
+        print(f"✓ Exact key statistics of {col}: {expected}")
+
+    return True
+
+def main():
+    document_id, workflow_id = upload_document()
+    if not (document_id and workflow_id):
+        sys.exit(1)
+    if not test_discover_high_correlations(workflow_id, document_id):
+        sys.exit(1)
+    if not test_discover_large_integer_statistics(workflow_id, document_id):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
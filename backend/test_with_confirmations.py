@@ -33,10 +33,10 @@ def show_instance_folder(document_id, stage_num):
     print(f"   Current stage folder will contain:")
     if stage_num == 1:
         print("   - original_<filename>.csv (uploaded file)")
-        print("   - data.csv (normalized copy)")
+        print("   - data.parquet (normalized copy)")
         print("   - stage_metadata.json (profiling results)")
     elif stage_num == 2:
-        print("   - cleaned_data.csv")
+        print("   - cleaned_data.parquet")
         print("   - imputation_log.json")
         print("   - outlier_report.json")
         print("   - stage_metadata.json")
@@ -306,6 +306,19 @@ CREATE TABLE IF NOT EXISTS report_templates (
 ) ENGINE = MergeTree()
 ORDER BY (template_type, template_name);
 
+-- 16. Workflow stage events - append-only stage status changes; the latest
+-- event per stage is its current status (avoids ALTER ... UPDATE mutations)
+CREATE TABLE IF NOT EXISTS workflow_stage_events (
+    workflow_id UUID,
+    stage_number UInt8,
+    status LowCardinality(String),
+    event_time DateTime64(3) DEFAULT now64(3),
+    output_data Nullable(String), -- JSON string
+    user_actions Nullable(String) -- JSON string
+) ENGINE = MergeTree()
+ORDER BY (workflow_id, stage_number, event_time)
+PARTITION BY toYYYYMM(event_time);
+
 -- Create indexes for better query performance
 ALTER TABLE documents ADD INDEX idx_status (status) TYPE minmax GRANULARITY 4;
 ALTER TABLE workflows ADD INDEX idx_status (status) TYPE minmax GRANULARITY 4;
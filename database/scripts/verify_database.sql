@@ -44,6 +44,9 @@ DESCRIBE TABLE reports;
 SELECT '--- audit_log table ---' as table_info;
 DESCRIBE TABLE audit_log;
 
+SELECT '--- workflow_stage_events table ---' as table_info;
+DESCRIBE TABLE workflow_stage_events;
+
 -- Check materialized views
 SELECT '========== Materialized Views ==========' as info;
 SELECT name FROM system.tables 